@@ -0,0 +1,178 @@
+import sys
+import time
+
+from generator import generate_puzzle
+from logic import *
+
+SIZES = [4, 6, 8, 25, 50, 100]
+RING_SIZES = [5, 7, 9]
+DEPTH = 4
+PUZZLES = 3
+STATEMENTS_PER_INHABITANT = 2
+
+# Brute-force engines are skipped on puzzles with more symbols than this
+MAX_ENUMERATED_SYMBOLS = 16
+
+
+def main():
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python benchmark.py [sizes] [depth]")
+    sizes = SIZES
+    if len(sys.argv) > 1:
+        sizes = [int(size) for size in sys.argv[1].split(",")]
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else DEPTH
+
+    # Serial against parallel model checking, on puzzles that enumerate
+    # their whole search space
+    print(f"{'inhabitants':>11} {'symbols':>7} {'serial':>9} "
+          f"{f'depth {depth}':>9} {'speedup':>7}")
+    for n in RING_SIZES:
+        serial, parallel = benchmark_ring(n, depth)
+        print(f"{n:>11} {2 * n:>7} {serial:>8.2f}s {parallel:>8.2f}s "
+              f"{serial / parallel:>6.2f}x")
+    print()
+
+    engines = [("model_check", check_serial)]
+    if depth > 0:
+        engines.append((f"model_check (depth {depth})",
+                        lambda knowledge, queries: check_parallel(
+                            knowledge, queries, depth)))
+    engines.append(("KnowledgeBase", check_incremental))
+
+    print(f"{'inhabitants':>11} {'engine':<24} {'time':>9} {'nodes':>10}")
+    for n in sizes:
+        results = benchmark(n, engines)
+        for name, (elapsed, nodes) in results.items():
+            if elapsed is None:
+                print(f"{n:>11} {name:<24} {'-':>9} {'-':>10}")
+            else:
+                print(f"{n:>11} {name:<24} {elapsed:>8.3f}s {nodes:>10}")
+
+
+def benchmark_ring(n, depth):
+    """
+    Checks the query of the ring puzzle with `n` inhabitants serially
+    and with cube-and-conquer at `depth`. Returns both wall times.
+
+    Exits if the two disagree.
+    """
+    knowledge, query = ring_puzzle(n)
+
+    start = time.perf_counter()
+    serial = model_check(knowledge, query)
+    serial_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parallel = model_check(knowledge, query, depth=depth)
+    parallel_time = time.perf_counter() - start
+
+    if serial != parallel:
+        sys.exit(f"Engines disagree on the ring of {n} inhabitants")
+    return serial_time, parallel_time
+
+
+def ring_puzzle(n):
+    """
+    Returns a (knowledge, query) pair for `n` inhabitants standing in a
+    ring, where each one says "the next one is a knave" and the last one
+    says "the first one is a knight".
+
+    The query holds in every model, so checking it enumerates the whole
+    search space.
+    """
+    knights = [Symbol(f"{i} is a Knight") for i in range(n)]
+    knaves = [Symbol(f"{i} is a Knave") for i in range(n)]
+
+    knowledge = And()
+    for i in range(n):
+
+        # Everyone is either a knight or a knave, but not both
+        knowledge.add(Biconditional(knights[i], Not(knaves[i])))
+
+        # Knights tell the truth, knaves lie
+        if i < n - 1:
+            knowledge.add(Biconditional(knights[i], knaves[i + 1]))
+        else:
+            knowledge.add(Biconditional(knights[i], knights[0]))
+
+    query = Or(knights[0], knaves[0])
+    return knowledge, query
+
+
+def benchmark(n, engines):
+    """
+    Runs every engine on PUZZLES random puzzles with `n` inhabitants.
+    Returns a dictionary mapping each engine name to its total
+    (wall time, nodes), or (None, None) if it was skipped.
+
+    Exits if the engines disagree on any query, or if an engine claims
+    a query follows that the puzzle's hidden solution contradicts.
+    """
+    totals = {name: [0, 0] for name, _ in engines}
+    for seed in range(PUZZLES):
+        knowledge, knights, knaves, solution = generate_puzzle(
+            n, STATEMENTS_PER_INHABITANT * n, seed=seed
+        )
+        if not knowledge.evaluate(solution):
+            sys.exit(f"Puzzle {seed} with {n} inhabitants has no solution")
+
+        queries = knights + knaves
+        answers = dict()
+        for name, engine in engines:
+            enumerated = name.startswith("model_check")
+            if enumerated and 2 * n > MAX_ENUMERATED_SYMBOLS:
+                totals[name] = None
+                continue
+            start = time.perf_counter()
+            answers[name], nodes = engine(knowledge, queries)
+            totals[name][0] += time.perf_counter() - start
+            totals[name][1] += nodes
+
+        # Every engine must reach the same conclusions
+        if len(set(tuple(result) for result in answers.values())) > 1:
+            sys.exit(f"Engines disagree on puzzle {seed} "
+                     f"with {n} inhabitants")
+
+        # Anything entailed must hold in the solution, which also checks
+        # an engine running on its own
+        for name, result in answers.items():
+            for query, entailed in zip(queries, result):
+                if entailed and not solution[query.name]:
+                    sys.exit(f"{name} wrongly entails {query} "
+                             f"in puzzle {seed} with {n} inhabitants")
+
+    return {
+        name: tuple(total) if total is not None else (None, None)
+        for name, total in totals.items()
+    }
+
+
+def check_serial(knowledge, queries):
+    """Answers each query with a fresh call to model_check."""
+    stats = {"nodes": 0}
+    answers = [model_check(knowledge, query, stats=stats)
+               for query in queries]
+    return answers, stats["nodes"]
+
+
+def check_parallel(knowledge, queries, depth):
+    """Answers each query with cube-and-conquer model checking."""
+    stats = {"nodes": 0}
+    answers = [model_check(knowledge, query, depth=depth, stats=stats)
+               for query in queries]
+    return answers, stats["nodes"]
+
+
+def check_incremental(knowledge, queries):
+    """
+    Answers every query from a single incremental knowledge base.
+    Its nodes are the solver's assignments, by decision or propagation,
+    and its conflicts.
+    """
+    kb = KnowledgeBase(*knowledge.conjuncts)
+    answers = [kb.ask(query) for query in queries]
+    return answers, kb.stats["assignments"] + kb.stats["conflicts"]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import random
+import string
+
+from logic import *
+
+
+def inhabitant_name(i):
+    """Returns a name for the i-th inhabitant: A, B, ..., Z, AA, AB, ..."""
+    name = ""
+    i += 1
+    while i:
+        i, letter = divmod(i - 1, 26)
+        name = string.ascii_uppercase[letter] + name
+    return name
+
+
+def generate_puzzle(n, m, seed=None):
+    """
+    Returns a random knights-and-knaves puzzle with `n` inhabitants
+    and `m` statements, as a (knowledge, knights, knaves, solution) tuple.
+
+    `knights` and `knaves` list the symbols of each inhabitant, and
+    `solution` is a model (mapping symbol names to values) that satisfies
+    the knowledge base, so every generated puzzle is solvable.
+    """
+    rng = random.Random(seed)
+    names = [inhabitant_name(i) for i in range(n)]
+    knights = [Symbol(f"{name} is a Knight") for name in names]
+    knaves = [Symbol(f"{name} is a Knave") for name in names]
+
+    # Pick the hidden kind of every inhabitant
+    kinds = [rng.random() < 0.5 for _ in range(n)]
+    solution = dict()
+    for i in range(n):
+        solution[knights[i].name] = kinds[i]
+        solution[knaves[i].name] = not kinds[i]
+
+    knowledge = And()
+    for i in range(n):
+
+        # Every inhabitant is either a knight or a knave, but not both
+        knowledge.add(Or(knights[i], knaves[i]))
+        knowledge.add(Not(And(knights[i], knaves[i])))
+
+    for _ in range(m):
+
+        # Draw claims until one is true exactly when the speaker is a knight
+        speaker = rng.randrange(n)
+        while True:
+            claim = random_claim(rng, knights, knaves)
+            if claim.evaluate(solution) == kinds[speaker]:
+                break
+        knowledge.add(Biconditional(knights[speaker], claim))
+
+    return knowledge, knights, knaves, solution
+
+
+def random_claim(rng, knights, knaves):
+    """Returns a random claim an inhabitant could make about the others."""
+    x, y = rng.randrange(len(knights)), rng.randrange(len(knights))
+    kind = rng.randrange(5)
+
+    # "X is a knight." / "X is a knave."
+    if kind == 0:
+        return knights[x]
+    elif kind == 1:
+        return knaves[x]
+
+    # "X and Y are the same kind."
+    elif kind == 2:
+        return Or(And(knights[x], knights[y]), And(knaves[x], knaves[y]))
+
+    # "X and Y are of different kinds."
+    elif kind == 3:
+        return Or(And(knights[x], knaves[y]), And(knaves[x], knights[y]))
+
+    # "If X is a knight, then Y is a knave."
+    else:
+        return Implication(knights[x], knaves[y])
@@ -1,4 +1,7 @@
 import itertools
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 
 class Sentence():
@@ -225,39 +228,776 @@ class Biconditional(Sentence):
         return set.union(self.left.symbols(), self.right.symbols())
 
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+class Constant(Sentence):
+    def __init__(self, value):
+        self.value = bool(value)
 
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
+    def __eq__(self, other):
+        return isinstance(other, Constant) and self.value == other.value
 
-        # If model has an assignment for each symbol
-        if not symbols:
+    def __hash__(self):
+        return hash(("constant", self.value))
 
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
-        else:
+    def __repr__(self):
+        return "TRUE" if self.value else "FALSE"
 
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
+    def evaluate(self, model):
+        return self.value
+
+    def formula(self):
+        return "⊤" if self.value else "⊥"
 
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
+    def symbols(self):
+        return set()
 
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
 
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+TRUE = Constant(True)
+FALSE = Constant(False)
+
+
+def substitute(sentence, model):
+    """
+    Returns a copy of `sentence` where every symbol assigned in `model`
+    is replaced by the matching constant.
+    """
+    if isinstance(sentence, Symbol):
+        if sentence.name in model:
+            return Constant(model[sentence.name])
+        return sentence
+    elif isinstance(sentence, Not):
+        return Not(substitute(sentence.operand, model))
+    elif isinstance(sentence, And):
+        return And(*[substitute(conjunct, model)
+                     for conjunct in sentence.conjuncts])
+    elif isinstance(sentence, Or):
+        return Or(*[substitute(disjunct, model)
+                    for disjunct in sentence.disjuncts])
+    elif isinstance(sentence, Implication):
+        return Implication(substitute(sentence.antecedent, model),
+                           substitute(sentence.consequent, model))
+    elif isinstance(sentence, Biconditional):
+        return Biconditional(substitute(sentence.left, model),
+                             substitute(sentence.right, model))
+    return sentence
+
+
+def simplify(sentence):
+    """
+    Returns an equivalent sentence with constants folded, nested
+    conjunctions and disjunctions flattened, double negations removed
+    and duplicate operands dropped.
+    """
+    if isinstance(sentence, Not):
+        operand = simplify(sentence.operand)
+        if isinstance(operand, Constant):
+            return Constant(not operand.value)
+        if isinstance(operand, Not):
+            return operand.operand
+        return Not(operand)
+
+    elif isinstance(sentence, (And, Or)):
+        conjunction = isinstance(sentence, And)
+        operands = sentence.conjuncts if conjunction else sentence.disjuncts
+
+        # The constant that decides the whole expression, and the one
+        # that can be dropped from it
+        absorbing = Constant(not conjunction)
+        neutral = Constant(conjunction)
+
+        # Flatten nested operands of the same kind and drop duplicates
+        flat = []
+        seen = set()
+        pending = [simplify(operand) for operand in operands]
+        pending.reverse()
+        while pending:
+            operand = pending.pop()
+            if isinstance(operand, type(sentence)):
+                children = (operand.conjuncts if conjunction
+                            else operand.disjuncts)
+                pending.extend(reversed(children))
+                continue
+            if operand == absorbing:
+                return absorbing
+            if operand == neutral or operand in seen:
+                continue
+            seen.add(operand)
+            flat.append(operand)
+
+        # An operand next to its own negation decides the expression too
+        for operand in flat:
+            if isinstance(operand, Not) and operand.operand in seen:
+                return absorbing
+
+        if not flat:
+            return neutral
+        if len(flat) == 1:
+            return flat[0]
+        return And(*flat) if conjunction else Or(*flat)
+
+    elif isinstance(sentence, Implication):
+        antecedent = simplify(sentence.antecedent)
+        consequent = simplify(sentence.consequent)
+        if antecedent == FALSE or consequent == TRUE:
+            return TRUE
+        if antecedent == TRUE:
+            return consequent
+        if consequent == FALSE:
+            return simplify(Not(antecedent))
+        if antecedent == consequent:
+            return TRUE
+        return Implication(antecedent, consequent)
+
+    elif isinstance(sentence, Biconditional):
+        left = simplify(sentence.left)
+        right = simplify(sentence.right)
+        if left == right:
+            return TRUE
+        for constant, other in ((left, right), (right, left)):
+            if isinstance(constant, Constant):
+                return other if constant.value else simplify(Not(other))
+        return Biconditional(left, right)
+
+    return sentence
+
+
+def polarities(sentence, positive=True, found=None):
+    """
+    Returns a dictionary mapping each symbol name in `sentence` to the set
+    of polarities (True for positive, False for negative) it occurs with.
+    """
+    if found is None:
+        found = dict()
+    if isinstance(sentence, Symbol):
+        found.setdefault(sentence.name, set()).add(positive)
+    elif isinstance(sentence, Not):
+        polarities(sentence.operand, not positive, found)
+    elif isinstance(sentence, And):
+        for conjunct in sentence.conjuncts:
+            polarities(conjunct, positive, found)
+    elif isinstance(sentence, Or):
+        for disjunct in sentence.disjuncts:
+            polarities(disjunct, positive, found)
+    elif isinstance(sentence, Implication):
+        polarities(sentence.antecedent, not positive, found)
+        polarities(sentence.consequent, positive, found)
+    elif isinstance(sentence, Biconditional):
+        for side in (sentence.left, sentence.right):
+            polarities(side, True, found)
+            polarities(side, False, found)
+    return found
+
+
+def components(sentences):
+    """
+    Groups sentences into lists that share symbols with each other,
+    directly or through other sentences of the same group.
+    """
+    groups = []
+    for sentence in sentences:
+        symbols = sentence.symbols()
+        group = [sentence]
+        for other in list(groups):
+            if symbols & other[1]:
+                groups.remove(other)
+                group.extend(other[0])
+                symbols = symbols | other[1]
+        groups.append((group, symbols))
+    return [group for group, _ in groups]
+
+
+def preprocess(knowledge, query):
+    """
+    Returns a simplified (knowledge, query) pair that gives the same
+    entailment answer as the original one.
+
+    Besides simplifying both sentences, drops the parts of the knowledge
+    base that share no symbols with the query (cone of influence) and
+    assigns symbols that only occur with one polarity in
+    knowledge ∧ ¬query (pure literals).
+    """
+    knowledge = simplify(knowledge)
+    query = simplify(query)
+
+    # Keep only the conjuncts connected to the query; the rest can only
+    # matter if they are unsatisfiable, in which case everything follows
+    if query.symbols():
+        conjuncts = (knowledge.conjuncts if isinstance(knowledge, And)
+                     else [knowledge])
+        relevant = []
+        for group in components(conjuncts):
+            if set.union(*[s.symbols() for s in group]) & query.symbols():
+                relevant.extend(group)
+            elif model_check(And(*group), FALSE):
+                return FALSE, query
+        knowledge = simplify(And(*relevant))
+
+    # Assign pure literals until none are left
+    while True:
+        found = polarities(knowledge)
+        polarities(query, False, found)
+        pure = {
+            name: polarity.pop()
+            for name, polarity in found.items()
+            if len(polarity) == 1
+        }
+        if not pure:
+            return knowledge, query
+        knowledge = simplify(substitute(knowledge, pure))
+        query = simplify(substitute(query, pure))
+
+
+def check_all(knowledge, query, symbols, model, stats=None):
+    """Checks if knowledge base entails query, given a particular model."""
+
+    # Count visited nodes of the search tree if asked to
+    if stats is not None:
+        stats["nodes"] += 1
+
+    # If model has an assignment for each symbol
+    if not symbols:
+
+        # If knowledge base is true in model, then query must also be true
+        if knowledge.evaluate(model):
+            return query.evaluate(model)
+        return True
+    else:
+
+        # Choose one of the remaining unused symbols
+        remaining = symbols.copy()
+        p = remaining.pop()
+
+        # Create a model where the symbol is true
+        model_true = model.copy()
+        model_true[p] = True
+
+        # Create a model where the symbol is false
+        model_false = model.copy()
+        model_false[p] = False
+
+        # Ensure entailment holds in both models
+        return (check_all(knowledge, query, remaining, model_true, stats) and
+                check_all(knowledge, query, remaining, model_false, stats))
+
+
+def cubes(symbols, model):
+    """
+    Yields every extension of `model` that assigns all of `symbols`.
+    """
+    symbols = sorted(symbols)
+    for values in itertools.product([True, False], repeat=len(symbols)):
+        cube = model.copy()
+        cube.update(zip(symbols, values))
+        yield cube
+
+
+# Set in worker processes once any worker has found a counter-model
+_stop = None
+
+# Symbols each worker splits its cube on, so it can notice `_stop` often
+WORKER_SPLIT = 8
+
+
+def _init_worker(stop):
+    global _stop
+    _stop = stop
+
+
+def _check_cube(knowledge, query, symbols, model):
+    """
+    Checks entailment within one cube of the search space, giving up
+    early once another worker has found a counter-model.
+    Returns the result and the number of search nodes visited.
+    """
+    split = sorted(symbols)[:WORKER_SPLIT]
+    remaining = symbols - set(split)
+    stats = {"nodes": 0}
+    for cube in cubes(split, model):
+        if _stop.is_set():
+            return True, stats["nodes"]
+        if not check_all(knowledge, query, remaining, cube, stats):
+            _stop.set()
+            return False, stats["nodes"]
+    return True, stats["nodes"]
+
+
+def model_check(knowledge, query, depth=0, processes=None, stats=None):
+    """
+    Checks if knowledge base entails query.
+
+    With `depth` greater than 0, splits the search space on the first
+    `depth` symbols and checks the resulting 2^depth cubes in a pool
+    of `processes` worker processes (one per CPU by default).
+
+    If `stats` is a dictionary, the number of search nodes visited is
+    added to its "nodes" entry.
+    """
+    if stats is not None:
+        stats.setdefault("nodes", 0)
+
+    # Shrink the problem before enumerating any models
+    knowledge, query = preprocess(knowledge, query)
 
     # Get all symbols in both knowledge and query
     symbols = set.union(knowledge.symbols(), query.symbols())
 
     # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    if depth <= 0 or not symbols:
+        return check_all(knowledge, query, symbols, dict(), stats)
+
+    split = sorted(symbols)[:depth]
+    remaining = symbols - set(split)
+    stop = multiprocessing.Event()
+    executor = ProcessPoolExecutor(
+        max_workers=processes, initializer=_init_worker, initargs=(stop,)
+    )
+    futures = []
+    try:
+        for cube in cubes(split, dict()):
+            futures.append(executor.submit(_check_cube, knowledge, query,
+                                           remaining, cube))
+
+        # Any cube with a counter-model settles the answer
+        for future in as_completed(futures):
+            entailed, nodes = future.result()
+            if stats is not None:
+                stats["nodes"] += nodes
+            if not entailed:
+                return False
+        return True
+    finally:
+        stop.set()
+
+        # Drop cubes no worker has started yet
+        for future in futures:
+            future.cancel()
+        executor.shutdown()
+
+
+def iter_models(knowledge, symbols=()):
+    """
+    Yields, one at a time, every model of the knowledge base over its
+    symbols plus any extra symbol names in `symbols`.
+
+    Models are generated lazily by splitting on one symbol at a time and
+    simplifying, so branches that make the knowledge base false are never
+    expanded and only the current branch is held in memory.
+    """
+    names = sorted(set.union(knowledge.symbols(), set(symbols)))
+
+    def expand(sentence, model):
+        if sentence == FALSE:
+            return
+
+        # Once the sentence holds, every completion of the model does too
+        if sentence == TRUE:
+            free = [name for name in names if name not in model]
+            for values in itertools.product([True, False], repeat=len(free)):
+                completed = model.copy()
+                completed.update(zip(free, values))
+                yield completed
+            return
+
+        p = min(sentence.symbols())
+        for value in (True, False):
+            extended = model.copy()
+            extended[p] = value
+            yield from expand(simplify(substitute(sentence, {p: value})),
+                              extended)
+
+    yield from expand(simplify(knowledge), dict())
+
+
+def count_models(knowledge, symbols=()):
+    """
+    Returns the number of models of the knowledge base over its symbols
+    plus any extra symbol names in `symbols`.
+
+    Conjuncts that share no symbols are counted separately and multiplied
+    together, and counts of subformulas met more than once are cached.
+    """
+    names = set.union(knowledge.symbols(), set(symbols))
+    cache = dict()
+
+    def count(sentence):
+        """Counts the models of `sentence` over its own symbols."""
+        if isinstance(sentence, Constant):
+            return 1 if sentence.value else 0
+        if sentence in cache:
+            return cache[sentence]
+
+        conjuncts = (sentence.conjuncts if isinstance(sentence, And)
+                     else [sentence])
+        groups = components(conjuncts)
+        if len(groups) > 1:
+
+            # Independent components multiply
+            result = 1
+            for group in groups:
+                result *= count(simplify(And(*group)))
+                if result == 0:
+                    break
+        else:
+
+            # Split on a symbol, counting symbols that dropped out as free
+            symbols = sentence.symbols()
+            p = min(symbols)
+            result = 0
+            for value in (True, False):
+                branch = simplify(substitute(sentence, {p: value}))
+                free = len(symbols) - 1 - len(branch.symbols())
+                result += count(branch) * 2 ** free
+
+        cache[sentence] = result
+        return result
+
+    knowledge = simplify(knowledge)
+    return count(knowledge) * 2 ** (len(names) - len(knowledge.symbols()))
+
+
+class KnowledgeBase():
+    """
+    Knowledge base that can be told new sentences and asked queries
+    incrementally.
+
+    Sentences are converted to clauses over integer variables (Tseitin
+    encoding) and kept in a conflict-driven clause learning solver.
+    Learned clauses, watched literals and variable activities survive
+    between calls, so each `tell` or `ask` only pays for what is new.
+    Queries are answered by solving under the assumption that the
+    query is false, which leaves the stored clauses untouched.
+    """
+
+    def __init__(self, *sentences):
+
+        # Variables are numbered from 1; literal -v is the negation of v
+        self.variables = dict()
+        self.names = dict()
+        self.definitions = dict()
+
+        # Clauses and, for each literal, the clauses watching it
+        self.clauses = []
+        self.learned = []
+        self.watches = dict()
+
+        # Current assignment and the trail of assigned literals
+        self.values = dict()
+        self.levels = dict()
+        self.reasons = dict()
+        self.trail = []
+        self.trail_lim = []
+        self.head = 0
+
+        # Branching heuristics
+        self.activity = dict()
+        self.phase = dict()
+        self.increment = 1.0
+
+        # Sentences told so far, and whether they contradict each other
+        self.sentences = []
+        self.inconsistent = False
+
+        # Search effort spent so far
+        self.stats = {"decisions": 0, "assignments": 0, "conflicts": 0}
+
+        for sentence in sentences:
+            self.tell(sentence)
+
+    def knowledge(self):
+        """Returns the knowledge base as a single sentence."""
+        return And(*self.sentences)
+
+    def symbols(self):
+        """Returns a set of all symbols told to the knowledge base."""
+        return set(self.names.values())
+
+    def tell(self, sentence):
+        """Adds a sentence to the knowledge base."""
+        Sentence.validate(sentence)
+        self.sentences.append(sentence)
+        literal = self.encode(simplify(sentence))
+        self.add_clause([literal])
+
+    def ask(self, query):
+        """Checks if the knowledge base entails query."""
+        Sentence.validate(query)
+        literal = self.encode(simplify(query))
+        return not self.solve([-literal])
+
+    def variable(self, key, name=None):
+        """Returns the variable for `key`, creating it if needed."""
+        if key not in self.variables:
+            var = len(self.variables) + 1
+            self.variables[key] = var
+            self.activity[var] = 0.0
+            self.phase[var] = False
+            self.watches[var] = []
+            self.watches[-var] = []
+            if name is not None:
+                self.names[var] = name
+        return self.variables[key]
+
+    def encode(self, sentence):
+        """
+        Returns a literal equivalent to `sentence`, adding the clauses
+        that define any new subformula variables.
+        """
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence, sentence.name)
+        if isinstance(sentence, Not):
+            return -self.encode(sentence.operand)
+        if sentence in self.definitions:
+            return self.definitions[sentence]
+
+        if isinstance(sentence, Constant):
+            literal = self.variable(TRUE)
+            self.add_clause([literal])
+            if not sentence.value:
+                literal = -literal
+
+        elif isinstance(sentence, (And, Or)):
+            conjunction = isinstance(sentence, And)
+            operands = (sentence.conjuncts if conjunction
+                        else sentence.disjuncts)
+            literals = [self.encode(operand) for operand in operands]
+            literal = self.variable(sentence)
+
+            # x <=> (l1 ∧ l2 ...) or, by duality, ¬x <=> (¬l1 ∧ ¬l2 ...)
+            sign = 1 if conjunction else -1
+            for operand in literals:
+                self.add_clause([-sign * literal, sign * operand])
+            self.add_clause([sign * literal]
+                            + [-sign * operand for operand in literals])
+
+        elif isinstance(sentence, Implication):
+            literal = self.encode(
+                Or(Not(sentence.antecedent), sentence.consequent)
+            )
+
+        elif isinstance(sentence, Biconditional):
+            left = self.encode(sentence.left)
+            right = self.encode(sentence.right)
+            literal = self.variable(sentence)
+            self.add_clause([-literal, -left, right])
+            self.add_clause([-literal, left, -right])
+            self.add_clause([literal, left, right])
+            self.add_clause([literal, -left, -right])
+
+        else:
+            raise TypeError("must be a logical sentence")
+
+        self.definitions[sentence] = literal
+        return literal
+
+    def value(self, literal):
+        """Returns the truth value of a literal, or None if unassigned."""
+        value = self.values.get(abs(literal))
+        if value is None:
+            return None
+        return value == (literal > 0)
+
+    def add_clause(self, clause):
+        """Adds a clause to the solver while it is at decision level 0."""
+        if self.inconsistent:
+            return
+
+        # Drop literals already false and clauses already satisfied
+        literals = []
+        for literal in clause:
+            value = self.value(literal)
+            if value is True or -literal in literals:
+                return
+            if value is None and literal not in literals:
+                literals.append(literal)
+
+        if not literals:
+            self.inconsistent = True
+        elif len(literals) == 1:
+            self.assign(literals[0], None)
+            if self.propagate() is not None:
+                self.inconsistent = True
+        else:
+            self.clauses.append(literals)
+            self.watch(literals)
+
+    def watch(self, clause):
+        """Watches the first two literals of a clause."""
+        self.watches[clause[0]].append(clause)
+        self.watches[clause[1]].append(clause)
+
+    def assign(self, literal, reason):
+        """Makes `literal` true at the current decision level."""
+        var = abs(literal)
+        self.values[var] = literal > 0
+        self.levels[var] = len(self.trail_lim)
+        self.reasons[var] = reason
+        self.trail.append(literal)
+        self.stats["assignments"] += 1
+
+    def propagate(self):
+        """
+        Performs unit propagation over the watched literals.
+        Returns a conflicting clause, or None if there is no conflict.
+        """
+        while self.head < len(self.trail):
+            false_literal = -self.trail[self.head]
+            self.head += 1
+
+            watchers = self.watches[false_literal]
+            self.watches[false_literal] = kept = []
+            for index, clause in enumerate(watchers):
+
+                # Keep the falsified literal in the second position
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self.value(clause[0]) is True:
+                    kept.append(clause)
+                    continue
+
+                # Look for another literal to watch
+                for k in range(2, len(clause)):
+                    if self.value(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches[clause[1]].append(clause)
+                        break
+                else:
+
+                    # Clause is unit or conflicting
+                    kept.append(clause)
+                    if self.value(clause[0]) is False:
+                        kept.extend(watchers[index + 1:])
+                        return clause
+                    self.assign(clause[0], clause)
+        return None
+
+    def analyze(self, conflict):
+        """
+        Derives a learned clause from a conflict (first unique
+        implication point). Returns the clause and the level to
+        backtrack to.
+        """
+        level = len(self.trail_lim)
+        seen = set()
+        learned = []
+        pending = 0
+        literal = None
+        index = len(self.trail) - 1
+        clause = conflict
+
+        while True:
+            for other in clause:
+                var = abs(other)
+                if literal is not None and var == abs(literal):
+                    continue
+                if var in seen or self.levels[var] == 0:
+                    continue
+                seen.add(var)
+                self.bump(var)
+                if self.levels[var] == level:
+                    pending += 1
+                else:
+                    learned.append(other)
+
+            # Walk back the trail to the next literal involved
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.reasons[abs(literal)]
+
+        learned.insert(0, -literal)
+        if len(learned) == 1:
+            return learned, 0
+
+        # Watch the literal from the highest remaining level second
+        deepest = max(range(1, len(learned)),
+                      key=lambda k: self.levels[abs(learned[k])])
+        learned[1], learned[deepest] = learned[deepest], learned[1]
+        return learned, self.levels[abs(learned[1])]
+
+    def bump(self, var):
+        """Increases the branching activity of a variable."""
+        self.activity[var] += self.increment
+        if self.activity[var] > 1e100:
+            for other in self.activity:
+                self.activity[other] *= 1e-100
+            self.increment *= 1e-100
+
+    def backtrack(self, level):
+        """Undoes all assignments above decision level `level`."""
+        if len(self.trail_lim) <= level:
+            return
+        start = self.trail_lim[level]
+        for literal in self.trail[start:]:
+            var = abs(literal)
+            self.phase[var] = literal > 0
+            del self.values[var]
+            del self.reasons[var]
+            del self.levels[var]
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.head = len(self.trail)
+
+    def decide(self):
+        """Returns the unassigned variable with the highest activity."""
+        best = None
+        for var, activity in self.activity.items():
+            if var not in self.values and (
+                best is None or activity > self.activity[best]
+            ):
+                best = var
+        return best
+
+    def solve(self, assumptions=()):
+        """
+        Checks if the clauses are satisfiable when every literal in
+        `assumptions` is true. Leaves the solver at decision level 0.
+        """
+        if self.inconsistent:
+            return False
+        if self.propagate() is not None:
+            self.inconsistent = True
+            return False
+
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                if not self.trail_lim:
+                    self.inconsistent = True
+                    return False
+
+                # Learn from the conflict and jump back
+                self.stats["conflicts"] += 1
+                learned, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.learned.append(learned)
+                    self.watch(learned)
+                    self.assign(learned[0], learned)
+                self.increment *= 1.05
+                continue
+
+            # Decide assumptions first, one decision level each
+            level = len(self.trail_lim)
+            if level < len(assumptions):
+                literal = assumptions[level]
+                value = self.value(literal)
+                if value is False:
+                    self.backtrack(0)
+                    return False
+                self.trail_lim.append(len(self.trail))
+                if value is None:
+                    self.assign(literal, None)
+                continue
+
+            var = self.decide()
+            if var is None:
+                self.backtrack(0)
+                return True
+            self.stats["decisions"] += 1
+            self.trail_lim.append(len(self.trail))
+            self.assign(var if self.phase[var] else -var, None)
@@ -0,0 +1,75 @@
+import random
+import sys
+import time
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+BOARDS = [(16, 16, 40), (16, 30, 99), (50, 50, 500)]
+GAMES = 20
+REVEALED = 0.3
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python benchmark.py [games]")
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else GAMES
+
+    print(f"{'board':>9} {'mines':>6} {'inference':>9} {'sentences':>9} "
+          f"{'deductions':>10} {'time':>9} {'per move':>9}")
+    for height, width, mines in BOARDS:
+        for inference in ("subset", "linear"):
+            for representation in ("set", "bit"):
+                deductions, elapsed, moves = benchmark(
+                    height, width, mines, inference, games, representation
+                )
+                print(f"{height:>4}x{width:<4} {mines:>6} {inference:>9} "
+                      f"{representation:>9} {deductions:>10} "
+                      f"{elapsed:>8.3f}s {elapsed / moves * 1000:>7.3f}ms")
+
+
+def benchmark(height, width, mines, inference, games, representation="set"):
+    """
+    Reveals the same random safe cells to an AI using `inference` and
+    `representation` on `games` seeded boards.
+
+    Returns the number of cells the AI deduced to be mines or safe
+    without being shown them, the time spent in `add_knowledge`, and
+    the number of cells revealed.
+    """
+    deductions = 0
+    elapsed = 0
+    moves = 0
+    for seed in range(games):
+        random.seed(seed)
+        game = Minesweeper(height=height, width=width, mines=mines,
+                           seed=seed)
+        ai = MinesweeperAI(height=height, width=width, mines=mines,
+                           inference=inference,
+                           representation=representation)
+
+        # Same cells, in the same order, for every backend
+        cells = [
+            (i, j)
+            for i in range(height)
+            for j in range(width)
+            if not game.is_mine((i, j))
+        ]
+        shown = random.sample(cells, int(len(cells) * REVEALED))
+
+        start = time.perf_counter()
+        for cell in shown:
+            if cell not in ai.moves_made:
+                ai.moves_made.add(cell)
+                ai.add_knowledge(cell, game.nearby_mines(cell))
+                moves += 1
+        elapsed += time.perf_counter() - start
+
+        if not ai.mines <= game.mines or ai.safes & game.mines:
+            sys.exit(f"Wrong deduction with {inference} inference")
+        deductions += len(ai.mines) + len(ai.safes - ai.moves_made)
+
+    return deductions, elapsed, moves
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import functools
+import math
+
+
+def forced_cells(constraints):
+    """
+    Returns the sets of cells that must be mines and must be safe
+    given a list of (cells, count) constraints.
+
+    The constraints are written as a sparse 0/1 matrix, with one row per
+    constraint and one column per cell, against the mine counts. The
+    matrix is brought to reduced row echelon form with integer Gaussian
+    elimination. Every reduced row is then checked against the bounds
+    its cells can reach, since each cell is either 0 or 1: if the count
+    equals the largest (or smallest) possible sum, every cell in the row
+    is forced.
+    """
+    cells = sorted(set().union(*[cells for cells, _ in constraints]))
+    column = {cell: k for k, cell in enumerate(cells)}
+    rows = [
+        ({column[cell]: 1 for cell in constraint_cells}, count)
+        for constraint_cells, count in constraints
+    ]
+
+    mines = set()
+    safes = set()
+    for coefficients, count in eliminate(rows):
+        highest = sum(a for a in coefficients.values() if a > 0)
+        lowest = sum(a for a in coefficients.values() if a < 0)
+        if count == highest:
+            positive, negative = mines, safes
+        elif count == lowest:
+            positive, negative = safes, mines
+        else:
+            continue
+        for k, a in coefficients.items():
+            (positive if a > 0 else negative).add(cells[k])
+    return mines, safes
+
+
+def eliminate(rows):
+    """
+    Returns the rows of a system of integer linear equations, given as
+    (coefficients, value) pairs with sparse coefficient dictionaries,
+    in reduced row echelon form.
+
+    Rows are combined with integer multiples and divided by the greatest
+    common divisor of their entries, so no fractions are needed.
+    """
+    rows = [(dict(coefficients), value) for coefficients, value in rows]
+    columns = sorted(set().union(*[coefficients for coefficients, _ in rows]))
+
+    pivot = 0
+    for col in columns:
+
+        # Find a row with this column that is not already a pivot row
+        for r in range(pivot, len(rows)):
+            if rows[r][0].get(col):
+                break
+        else:
+            continue
+        rows[pivot], rows[r] = rows[r], rows[pivot]
+        pivot_coefficients, pivot_value = rows[pivot]
+        b = pivot_coefficients[col]
+
+        # Clear the column from every other row
+        for r, (coefficients, value) in enumerate(rows):
+            a = coefficients.get(col)
+            if r == pivot or not a:
+                continue
+            combined = {k: b * c for k, c in coefficients.items()}
+            for k, c in pivot_coefficients.items():
+                total = combined.get(k, 0) - a * c
+                if total:
+                    combined[k] = total
+                else:
+                    combined.pop(k, None)
+            rows[r] = reduce(combined, b * value - a * pivot_value)
+        pivot += 1
+
+    return [(coefficients, value)
+            for coefficients, value in rows if coefficients]
+
+
+def reduce(coefficients, value):
+    """
+    Divides a row by the greatest common divisor of its entries.
+    """
+    divisor = functools.reduce(math.gcd, coefficients.values(), value)
+    if divisor > 1:
+        coefficients = {k: c // divisor for k, c in coefficients.items()}
+        value //= divisor
+    return coefficients, value
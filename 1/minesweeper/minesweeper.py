@@ -1,5 +1,37 @@
+import functools
 import itertools
+import json
 import random
+import time
+
+import numpy as np
+
+from collections import deque
+
+from linear import forced_cells
+from probability import mine_probabilities
+
+# Random cells to try before listing every available one
+RANDOM_MOVE_ATTEMPTS = 20
+
+
+def traced(phase):
+    """
+    Decorates a MinesweeperAI method so that, when the AI is tracing,
+    the time spent in it is added to `phase` of the current move.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.trace is None:
+                return method(self, *args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self.timings[phase] += time.perf_counter() - start
+        return wrapper
+    return decorator
 
 
 class Minesweeper():
@@ -7,32 +39,81 @@ class Minesweeper():
     Minesweeper game representation
     """
 
-    def __init__(self, height=8, width=8, mines=8):
+    def __init__(self, height=8, width=8, mines=8, seed=None,
+                 first_click=None):
+        """
+        Creates a board with `mines` mines placed at random.
+
+        The same `seed` always gives the same board. If `first_click`
+        is given, no mine is placed on that cell or, when the board has
+        room for it, on any of its neighbors.
+        """
 
         # Set initial width, height, and number of mines
         self.height = height
         self.width = width
-        self.mines = set()
-
-        # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
-
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        self.mine_cells = None
+
+        # Cells (as linear indices i * width + j) that must stay safe
+        excluded = []
+        if first_click is not None:
+            i, j = first_click
+            excluded = [
+                ni * width + nj
+                for ni in range(max(i - 1, 0), min(i + 2, height))
+                for nj in range(max(j - 1, 0), min(j + 2, width))
+            ]
+            if height * width - len(excluded) < mines:
+                excluded = [i * width + j]
+        if height * width - len(excluded) < mines:
+            raise ValueError("more mines than cells")
+
+        # Sample mine positions without replacement among the other
+        # cells, then shift each past the excluded cells before it
+        rng = np.random.default_rng(seed)
+        positions = rng.choice(height * width - len(excluded), size=mines,
+                               replace=False)
+        excluded = np.array(sorted(excluded), dtype=np.int64)
+        positions += np.searchsorted(
+            excluded - np.arange(len(excluded)), positions, side="right"
+        )
+
+        # Initialize the field with the sampled mines
+        self.board = np.zeros(height * width, dtype=bool)
+        self.board[positions] = True
+        self.board = self.board.reshape(height, width)
+
+        # Count the mines around every cell at once
+        self.counts = self.count_nearby_mines()
 
         # At first, player has found no mines
         self.mines_found = set()
 
+    @property
+    def mines(self):
+        """
+        Set of all cells with a mine, built from the board when first used.
+        """
+        if self.mine_cells is None:
+            rows, columns = np.nonzero(self.board)
+            self.mine_cells = set(zip(rows.tolist(), columns.tolist()))
+        return self.mine_cells
+
+    def count_nearby_mines(self):
+        """
+        Returns an array with, for each cell, the number of mines
+        within one row and column of it, not including the cell itself.
+        """
+        padded = np.pad(self.board, 1).astype(np.uint8)
+        counts = np.zeros((self.height, self.width), dtype=np.uint8)
+
+        # Add up the board shifted towards each of the 8 neighbors
+        for di in range(3):
+            for dj in range(3):
+                if (di, dj) != (1, 1):
+                    counts += padded[di:di + self.height, dj:dj + self.width]
+        return counts
+
     def print(self):
         """
         Prints a text-based representation
@@ -41,7 +122,7 @@ class Minesweeper():
         for i in range(self.height):
             print("--" * self.width + "-")
             for j in range(self.width):
-                if self.board[i][j]:
+                if self.board[i, j]:
                     print("|X", end="")
                 else:
                     print("| ", end="")
@@ -50,7 +131,7 @@ class Minesweeper():
 
     def is_mine(self, cell):
         i, j = cell
-        return self.board[i][j]
+        return bool(self.board[i, j])
 
     def nearby_mines(self, cell):
         """
@@ -58,24 +139,32 @@ class Minesweeper():
         within one row and column of a given cell,
         not including the cell itself.
         """
+        i, j = cell
+        return int(self.counts[i, j])
 
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
+    def reveal(self, cell, revealed=()):
+        """
+        Reveals a safe cell, and, if no mines are nearby, flood-fills
+        outwards through every connected cell with no nearby mines.
 
-        return count
+        Returns a dictionary mapping each newly revealed cell to its
+        number of nearby mines. Cells in `revealed` are not revisited.
+        """
+        region = {cell: self.nearby_mines(cell)}
+        pending = [cell] if region[cell] == 0 else []
+        while pending:
+            i, j = pending.pop()
+            for ni in range(max(i - 1, 0), min(i + 2, self.height)):
+                for nj in range(max(j - 1, 0), min(j + 2, self.width)):
+                    neighbor = (ni, nj)
+                    if neighbor in region or neighbor in revealed:
+                        continue
+
+                    # Neighbors of a cell with no nearby mines are safe
+                    region[neighbor] = self.nearby_mines(neighbor)
+                    if region[neighbor] == 0:
+                        pending.append(neighbor)
+        return region
 
     def won(self):
         """
@@ -101,19 +190,43 @@ class Sentence():
     def __str__(self):
         return f"{self.cells} = {self.count}"
 
+    def __len__(self):
+        return len(self.cells)
+
     def known_mines(self):
         """
         Returns the set of all cells in self.cells known to be mines.
         """
         if self.count == len(self.cells):
-            return self.cells
+            return set(self.cells)
+        return set()
 
     def known_safes(self):
         """
         Returns the set of all cells in self.cells known to be safe.
         """
         if self.count == 0:
-            return self.cells
+            return set(self.cells)
+        return set()
+
+    def key(self):
+        """
+        Returns a hashable key identifying the sentence by its content.
+        """
+        return (frozenset(self.cells), self.count)
+
+    def issubset(self, other):
+        """
+        Checks if every cell of this sentence is also in `other`.
+        """
+        return self.cells <= other.cells
+
+    def difference(self, other):
+        """
+        Returns the sentence about the cells of this sentence that are
+        not in `other`, given that `other` is a subset of this sentence.
+        """
+        return Sentence(self.cells - other.cells, self.count - other.count)
 
     def mark_mine(self, cell):
         """
@@ -133,16 +246,271 @@ class Sentence():
             self.cells.remove(cell)
 
 
+class BitSentence(Sentence):
+    """
+    Sentence whose cells are stored as the bits of an integer.
+
+    Cell (i, j) is bit i * width + j of the board, counted from `base`,
+    the lowest cell in the sentence, so that masks stay as short as the
+    span of the sentence rather than the whole board. Subset tests,
+    differences and marking are bitwise operations. The cells as (i, j)
+    pairs are decoded from the mask once, and then kept up to date as
+    cells are marked.
+    """
+
+    def __init__(self, cells, count, width):
+        self.width = width
+        self.count = count
+        self.decoded = None
+        indices = [i * width + j for i, j in cells]
+        self.base = min(indices, default=0)
+        self.mask = 0
+        for index in indices:
+            self.mask |= 1 << (index - self.base)
+
+    @classmethod
+    def from_mask(cls, base, mask, count, width):
+        """
+        Returns the sentence for a mask of cells counted from `base`.
+        """
+        sentence = cls((), count, width)
+        sentence.base = base
+        sentence.mask = mask
+        sentence.normalize()
+        return sentence
+
+    def normalize(self):
+        """
+        Moves `base` up to the lowest cell still in the sentence.
+        """
+        if not self.mask:
+            self.base = 0
+            return
+        shift = (self.mask & -self.mask).bit_length() - 1
+        self.mask >>= shift
+        self.base += shift
+
+    @property
+    def cells(self):
+        if self.decoded is None:
+            self.decoded = set()
+            mask = self.mask
+            while mask:
+                low = mask & -mask
+                index = self.base + low.bit_length() - 1
+                self.decoded.add(divmod(index, self.width))
+                mask ^= low
+        return self.decoded
+
+    def __eq__(self, other):
+        if not isinstance(other, BitSentence):
+            return Sentence.__eq__(self, other)
+        return self.key() == other.key()
+
+    def __len__(self):
+        return len(self.cells)
+
+    def aligned(self, other):
+        """
+        Returns the masks of both sentences counted from the same base.
+        """
+        base = min(self.base, other.base)
+        return (self.mask << (self.base - base),
+                other.mask << (other.base - base),
+                base)
+
+    def known_mines(self):
+        if self.count == len(self):
+            return set(self.cells)
+        return set()
+
+    def known_safes(self):
+        if self.count == 0:
+            return set(self.cells)
+        return set()
+
+    def key(self):
+        return (self.base, self.mask, self.count)
+
+    def issubset(self, other):
+
+        # Each base is its sentence's lowest cell, so a sentence starting
+        # below `other` has a cell that `other` lacks
+        shift = self.base - other.base
+        if shift < 0:
+            return not self.mask
+        return (self.mask << shift) & ~other.mask == 0
+
+    def difference(self, other):
+        mask, other_mask, base = self.aligned(other)
+        return BitSentence.from_mask(base, mask & ~other_mask,
+                                     self.count - other.count, self.width)
+
+    def bit(self, cell):
+        """
+        Returns the bit of `cell` in the mask, or 0 if out of range.
+        """
+        index = cell[0] * self.width + cell[1] - self.base
+        return 1 << index if index >= 0 else 0
+
+    def mark_mine(self, cell):
+        bit = self.bit(cell)
+        if self.mask & bit:
+            self.mask ^= bit
+            self.count -= 1
+            self.normalize()
+            if self.decoded is not None:
+                self.decoded.discard(cell)
+
+    def mark_safe(self, cell):
+        bit = self.bit(cell)
+        if self.mask & bit:
+            self.mask ^= bit
+            self.normalize()
+            if self.decoded is not None:
+                self.decoded.discard(cell)
+
+
+class Knowledge():
+    """
+    Collection of sentences known to be true, indexed by cell
+    so that updates only touch the sentences mentioning a cell.
+    Sentences with the same cells and count are only kept once.
+    """
+
+    def __init__(self):
+
+        # Sentences by identity, identities by content, and by cell
+        self.sentences = dict()
+        self.keys = dict()
+        self.index = dict()
+
+        # Number of sentences ever added and removed
+        self.created = 0
+        self.removed = 0
+
+    def __iter__(self):
+        return iter(list(self.sentences.values()))
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def __contains__(self, sentence):
+        return self.sentences.get(id(sentence)) is sentence
+
+    def containing(self, cell):
+        """
+        Returns the sentences that mention `cell`.
+        """
+        return [self.sentences[key] for key in self.index.get(cell, ())]
+
+    def overlapping(self, sentence):
+        """
+        Returns the other sentences that share at least one cell
+        with `sentence`.
+        """
+        keys = set()
+        for cell in sentence.cells:
+            keys.update(self.index.get(cell, ()))
+        keys.discard(id(sentence))
+        return [self.sentences[key] for key in keys]
+
+    def add(self, sentence):
+        """
+        Adds a sentence unless it is empty or already known.
+        Returns True if the sentence was added.
+        """
+        if not len(sentence) or sentence.key() in self.keys:
+            return False
+        self.sentences[id(sentence)] = sentence
+        self.created += 1
+        self.keys[sentence.key()] = id(sentence)
+        for cell in sentence.cells:
+            self.index.setdefault(cell, set()).add(id(sentence))
+        return True
+
+    def mark_mine(self, cell):
+        """
+        Updates the sentences mentioning `cell` given that it is a mine.
+        Returns the sentences that changed and are still kept.
+        """
+        return self.mark(cell, True)
+
+    def mark_safe(self, cell):
+        """
+        Updates the sentences mentioning `cell` given that it is safe.
+        Returns the sentences that changed and are still kept.
+        """
+        return self.mark(cell, False)
+
+    def connected(self, cells):
+        """
+        Returns the sentences linked to any of `cells` through
+        a chain of sentences sharing cells.
+        """
+        found = dict()
+        pending = [cell for cell in cells if cell in self.index]
+        visited = set(pending)
+        while pending:
+            for sentence in self.containing(pending.pop()):
+                if id(sentence) in found:
+                    continue
+                found[id(sentence)] = sentence
+                for other in sentence.cells:
+                    if other not in visited:
+                        visited.add(other)
+                        pending.append(other)
+        return list(found.values())
+
+    def mark(self, cell, mine):
+        changed = []
+        for key in self.index.pop(cell, ()):
+            sentence = self.sentences[key]
+            del self.keys[sentence.key()]
+            if mine:
+                sentence.mark_mine(cell)
+            else:
+                sentence.mark_safe(cell)
+
+            # Keep the sentence unless it became empty or a duplicate;
+            # only the marked cell's index entry needs to change
+            if len(sentence) and sentence.key() not in self.keys:
+                self.keys[sentence.key()] = key
+                changed.append(sentence)
+            else:
+                del self.sentences[key]
+                self.removed += 1
+                for other in sentence.cells:
+                    self.index[other].discard(key)
+        return changed
+
+
 class MinesweeperAI():
     """
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, mines=None, inference="subset",
+                 representation="set", trace=False):
 
-        # Set initial height and width
+        # Set initial height and width, and the number of mines if known
         self.height = height
         self.width = width
+        self.total_mines = mines
+
+        # Either "subset" for pairwise subset inference only, or "linear"
+        # to also solve the constraints as a system of linear equations
+        if inference not in ("subset", "linear"):
+            raise ValueError(f"unknown inference backend: {inference}")
+        self.inference = inference
+
+        # Either "set" for sentences holding sets of cells, or "bit" for
+        # BitSentence masks; with at most eight cells per sentence, sets
+        # are the faster of the two
+        if representation not in ("set", "bit"):
+            raise ValueError(f"unknown sentence representation: "
+                             f"{representation}")
+        self.representation = representation
 
         # Keep track of which cells have been clicked on
         self.moves_made = set()
@@ -151,8 +519,28 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Safe cells that may not have been played yet
+        self.safe_moves = []
+
+        # Sentences about the game known to be true
+        self.knowledge = Knowledge()
+
+        # Sentences added or changed since inference last ran
+        self.worklist = deque()
+        self.queued = set()
+
+        # Cells of sentences changed since the last linear solve
+        self.changed = set()
+
+        # Inference effort so far
+        self.passes = 0
+        self.solves = 0
+
+        # Per-move records, kept only if `trace` is set
+        self.trace = [] if trace else None
+        self.timings = dict.fromkeys(("marking", "inference", "selection"),
+                                     0.0)
+        self.last = self.counters()
 
     def mark_mine(self, cell):
         """
@@ -160,17 +548,67 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        for sentence in self.knowledge.mark_mine(cell):
+            self.enqueue(sentence)
 
     def mark_safe(self, cell):
         """
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
         """
-        self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        if cell not in self.safes:
+            self.safes.add(cell)
+            self.safe_moves.append(cell)
+        for sentence in self.knowledge.mark_safe(cell):
+            self.enqueue(sentence)
+
+    def enqueue(self, sentence):
+        """
+        Schedules a new or changed sentence for inference.
+        """
+        if id(sentence) not in self.queued:
+            self.queued.add(id(sentence))
+            self.worklist.append(sentence)
+
+    def infer(self):
+        """
+        Draws conclusions from the sentences in the worklist until
+        nothing new can be concluded.
+
+        A sentence whose cells are all mines or all safe marks them,
+        which updates (and re-schedules) the sentences sharing those
+        cells. Any other sentence is compared with the sentences it
+        overlaps, and subset differences are added as new sentences.
+        """
+        while self.worklist:
+            sentence = self.worklist.popleft()
+            self.queued.discard(id(sentence))
+            if sentence not in self.knowledge:
+                continue
+            self.passes += 1
+            if self.inference == "linear":
+                self.changed.update(sentence.cells)
+
+            # Mark cells whose status follows from this sentence alone
+            mines = sentence.known_mines()
+            safes = sentence.known_safes()
+            if mines or safes:
+                for cell in mines:
+                    self.mark_mine(cell)
+                for cell in safes:
+                    self.mark_safe(cell)
+                continue
+
+            # Infer new sentences from subsets
+            for other in self.knowledge.overlapping(sentence):
+                if other.issubset(sentence):
+                    inferred = sentence.difference(other)
+                elif sentence.issubset(other):
+                    inferred = other.difference(sentence)
+                else:
+                    continue
+                if self.knowledge.add(inferred):
+                    self.enqueue(inferred)
 
     def add_knowledge(self, cell, count):
         """
@@ -187,89 +625,126 @@ class MinesweeperAI():
             5) add any new sentences to the AI's knowledge base
                if they can be inferred from existing knowledge
         """
-        #1)
-        self.moves_made.add(cell)
+        # 1), 2) and 3)
+        self.observe({cell: count})
 
-        #2)
-        self.safes.add(cell)
-        for sentence in self.knowledge:
-            if cell in sentence.cells:
-                sentence.cells.remove(cell)
-
-        #3)
-        i , j = cell
-        cells1 = [
-            (i-1, j-1), (i-1, j), (i-1, j+1),
-            (i, j-1),              (i, j+1),
-            (i+1, j-1), (i+1, j), (i+1, j+1)
-        ]
-        cells2 = cells1.copy()
-        #print(f"Cell will be worked: {cell}")
-        #print(f"Neighbor Cells: {cells2}")
-
-        #Remove cells that are outside of board
-        for (i1, j1) in cells1:
-            if (i1<=-1 or i1>=8) or (j1<=-1 or j1>=8):
-                #print(f"first if, i1 = {i1}, j1 = {j1}")
-                cells2.remove((i1, j1))
-
-        cells1 = cells2.copy()
-
-        #Remove cells that are in Safes list
-        for (i1, j1) in cells1:       
-            if (i1, j1) in self.safes and (i1, j1) in cells2:
-                #print(f"Second if, i1 = {i1}, j1 = {j1}") 
-                cells2.remove((i1, j1))
-
-        cells1 = cells2.copy()
-
-        #Remove cells that are in Mines list
-        for (i1, j1) in cells1:
-            if (i1, j1) in self.mines and (i1, j1) in cells2:
-                #print(f"Third if, i1 = {i1}, j1 = {j1}")
-                cells2.remove((i1, j1))
-                count = count - 1
-        
-        cells1 = cells2.copy()    
-        
-        #print(f"Added info:{cells1}, count: {count}")
-        self.knowledge.append(Sentence(cells1, count))
-
-        #4)
-        for stc1 in self.knowledge:
-            stc1_cells = stc1.cells.copy()
-            if len(stc1.cells) == stc1.count:
-                for cell1 in stc1.cells:
-                    self.mines.add(cell1)
-                    stc1_cells.remove(cell1)
-                    stc1.count = stc1.count - 1 
-            elif stc1.count == 0 and len(stc1.cells) != 0:
-                for cell2 in stc1.cells:
-                    self.safes.add(cell2)
-                    if cell2 in stc1_cells:
-                        stc1_cells.remove(cell2)
-            elif len(stc1.cells) == 0:
-                self.knowledge.remove(stc1)
-            stc1.cells = stc1_cells.copy()
-
-        #5)
-        for sentence1 in self.knowledge:
-            set1 = sentence1.cells
-            count1 = sentence1.count
-            for sentence2 in self.knowledge:
-                set2 = sentence2.cells
-                count2 = sentence2.count
-                if set1 ^ set2 == {None}:
-                    break
-                if (set1 in set2) or (set2 in set1):
-                    STC = Sentence(set1 ^ set2, abs(count1 - count2))
-                    self.knowledge.append(STC) 
-
-        #print(f"Safes: {self.safes}")
-        #print(f"Mades: {self.moves_made}")
-        #print(f"Mines: {self.mines}")
-        #print(f"Knowledge: {self.knowledge}")
+        # 4) and 5) Propagate everything that changed until a fixpoint
+        self.propagate()
+        self.end_move(1)
+
+    def add_knowledge_many(self, cells_counts):
+        """
+        Like `add_knowledge`, for a whole region of revealed cells at
+        once, given as a dictionary mapping each cell to its count.
+        Inference runs a single time, after every sentence is added.
+        """
+        self.observe(cells_counts)
+        self.propagate()
+        self.end_move(len(cells_counts))
+
+    @traced("marking")
+    def observe(self, cells_counts):
+        """
+        Marks revealed cells as played and safe, and adds
+        the sentence about the neighbors of each one.
+        """
+        for cell in cells_counts:
+            self.moves_made.add(cell)
+            self.mark_safe(cell)
+        for cell, count in cells_counts.items():
+            self.add_sentence(cell, count)
+
+    @traced("inference")
+    def propagate(self):
+        """
+        Runs inference until nothing new can be concluded.
+        """
+        self.infer()
+        if self.inference == "linear":
+            self.solve_linear()
+
+    def add_sentence(self, cell, count):
+        """
+        Adds the sentence about the neighbors of a revealed cell
+        that are not yet known to be safe or mines.
+        """
+        cells = set()
+        for i in range(cell[0] - 1, cell[0] + 2):
+            for j in range(cell[1] - 1, cell[1] + 2):
+                if (i, j) == cell:
+                    continue
+                if not (0 <= i < self.height and 0 <= j < self.width):
+                    continue
+                if (i, j) in self.mines:
+                    count -= 1
+                elif (i, j) not in self.safes:
+                    cells.add((i, j))
+        if self.representation == "bit":
+            sentence = BitSentence(cells, count, self.width)
+        else:
+            sentence = Sentence(cells, count)
+        if self.knowledge.add(sentence):
+            self.enqueue(sentence)
 
+    def solve_linear(self):
+        """
+        Marks every cell forced by the sentences connected to what
+        changed since the last solve, treating them as a system of
+        linear equations, and propagates the result.
+        """
+        while self.changed:
+            self.solves += 1
+            sentences = self.knowledge.connected(self.changed)
+            self.changed = set()
+            mines, safes = forced_cells(
+                [(sentence.cells, sentence.count) for sentence in sentences]
+            )
+            for cell in mines - self.mines:
+                self.mark_mine(cell)
+            for cell in safes - self.safes:
+                self.mark_safe(cell)
+            self.infer()
+
+    def counters(self):
+        """
+        Returns the running totals that trace records are based on.
+        """
+        return {
+            "created": self.knowledge.created,
+            "removed": self.knowledge.removed,
+            "passes": self.passes,
+            "solves": self.solves
+        }
+
+    def end_move(self, revealed):
+        """
+        Closes the trace record of the current move, which covers
+        choosing it and learning from the `revealed` cells.
+        """
+        if self.trace is None:
+            return
+        counters = self.counters()
+        record = {"move": len(self.trace) + 1, "revealed": revealed,
+                  "knowledge": len(self.knowledge)}
+        for name, value in counters.items():
+            record[name] = value - self.last[name]
+        for phase, seconds in self.timings.items():
+            record[f"{phase}_time"] = seconds
+            self.timings[phase] = 0.0
+        self.last = counters
+        self.trace.append(record)
+
+    def export_trace(self, path):
+        """
+        Writes the trace, one JSON record per move, to `path`.
+        """
+        if self.trace is None:
+            raise ValueError("tracing is not enabled")
+        with open(path, "w") as f:
+            for record in self.trace:
+                f.write(json.dumps(record) + "\n")
+
+    @traced("selection")
     def make_safe_move(self):
         """
         Returns a safe cell to choose on the Minesweeper board.
@@ -279,12 +754,81 @@ class MinesweeperAI():
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-        for Move in self.safes:
-            if Move not in self.moves_made and Move not in self.mines:
-                self.moves_made.add(Move)
-                return Move
+        while self.safe_moves:
+            move = self.safe_moves.pop()
+            if move not in self.moves_made and move not in self.mines:
+                self.moves_made.add(move)
+                return move
         return None
 
+    @traced("selection")
+    def make_guess_move(self):
+        """
+        Returns the move least likely to be a mine when no move is
+        known to be safe, or None if no moves are left.
+
+        Probabilities come from counting the mine configurations
+        consistent with the knowledge base, and with the total number
+        of mines if it was given.
+        """
+        frontier = set()
+        for sentence in self.knowledge:
+            frontier.update(sentence.cells)
+
+        # Unknown cells that no sentence says anything about
+        pending = len(self.moves_made - self.safes - self.mines)
+        unconstrained = (self.height * self.width - len(self.safes)
+                         - len(self.mines) - pending - len(frontier))
+
+        mines_left = None
+        if self.total_mines is not None:
+            mines_left = self.total_mines - len(self.mines)
+        probabilities, default = mine_probabilities(
+            self.knowledge, unconstrained, mines_left
+        )
+
+        candidates = [
+            (probability, cell)
+            for cell, probability in probabilities.items()
+            if cell not in self.moves_made
+        ]
+        best = min(candidates, default=None)
+        if best is None or (unconstrained and default < best[0]):
+            move = self.make_unconstrained_move(frontier)
+            if move is not None:
+                return move
+        if best is None:
+            return None
+        self.moves_made.add(best[1])
+        return best[1]
+
+    def make_unconstrained_move(self, frontier):
+        """
+        Returns a random move that no sentence mentions, or None.
+        """
+        def available(cell):
+            return (cell not in self.moves_made and cell not in self.mines
+                    and cell not in self.safes and cell not in frontier)
+
+        for _ in range(RANDOM_MOVE_ATTEMPTS):
+            move = (random.randrange(self.height), random.randrange(self.width))
+            if available(move):
+                self.moves_made.add(move)
+                return move
+
+        moves = [
+            (i, j)
+            for i in range(self.height)
+            for j in range(self.width)
+            if available((i, j))
+        ]
+        if not moves:
+            return None
+        move = random.choice(moves)
+        self.moves_made.add(move)
+        return move
+
+    @traced("selection")
     def make_random_move(self):
         """
         Returns a move to make on the Minesweeper board.
@@ -292,11 +836,23 @@ class MinesweeperAI():
             1) have not already been chosen, and
             2) are not known to be mines
         """
-        i = random.randrange(7)
-        j = random.randrange(7)
-        if (i,j) not in self.moves_made and (i, j) not in self.mines:
-            self.moves_made.add((i,j))
-            return (i,j)
-        else:
-            return None 
+        # Try a few cells at random, which is enough on most boards
+        for _ in range(RANDOM_MOVE_ATTEMPTS):
+            move = (random.randrange(self.height), random.randrange(self.width))
+            if move not in self.moves_made and move not in self.mines:
+                self.moves_made.add(move)
+                return move
+
+        # Otherwise pick among every cell that is still available
+        moves = [
+            (i, j)
+            for i in range(self.height)
+            for j in range(self.width)
+            if (i, j) not in self.moves_made and (i, j) not in self.mines
+        ]
+        if not moves:
+            return None
+        move = random.choice(moves)
+        self.moves_made.add(move)
+        return move
 
@@ -0,0 +1,342 @@
+import math
+
+from collections import deque
+
+# Most states per cell counted exactly, and kept when estimating
+MAX_STATES = 200
+BEAM = 100
+
+
+def mine_probabilities(sentences, unconstrained, mines_left=None):
+    """
+    Returns the probability of being a mine for every cell mentioned in
+    `sentences`, and the probability for each of the `unconstrained`
+    unknown cells that no sentence mentions.
+
+    Cells are split into independent components of sentences sharing
+    cells. Each component's consistent mine configurations are counted,
+    by number of mines, with memoized backtracking, or estimated when
+    the component is too wide to count in interactive time (see
+    `count_configurations`). If the number of mines left on the board is
+    known, components and unconstrained cells are weighed together so
+    that the total number of mines adds up; otherwise every component is
+    weighed on its own and unconstrained cells get the average frontier
+    probability.
+    """
+    results = [count_configurations(cells, constraints)
+               for cells, constraints in components(sentences)]
+
+    if mines_left is None:
+        probabilities = dict()
+        for cells, total, per_cell in results:
+            configurations = sum(total.values())
+            for cell, distribution in zip(cells, per_cell):
+                probabilities[cell] = (sum(distribution.values())
+                                       / configurations)
+        if probabilities:
+            default = sum(probabilities.values()) / len(probabilities)
+        else:
+            default = 0.5
+        return probabilities, default
+
+    # Relative weight of leaving k mines for the unconstrained cells
+    def log_weight(k):
+        mines = mines_left - k
+        if mines < 0 or mines > unconstrained:
+            return None
+        return (math.lgamma(unconstrained + 1) - math.lgamma(mines + 1)
+                - math.lgamma(unconstrained - mines + 1))
+
+    # Scale every component's counts to floats of a manageable size
+    scaled = []
+    for cells, total, per_cell in results:
+        largest = max(total.values())
+        scaled.append((
+            cells,
+            {k: count / largest for k, count in total.items()},
+            [{k: count / largest for k, count in distribution.items()}
+             for distribution in per_cell]
+        ))
+
+    # Mine count distributions of all components but one, for each one
+    prefixes = [{0: 1.0}]
+    for _, total, _ in scaled:
+        prefixes.append(convolve(prefixes[-1], total))
+    suffixes = [{0: 1.0}]
+    for _, total, _ in reversed(scaled):
+        suffixes.append(convolve(suffixes[-1], total))
+    suffixes.reverse()
+
+    everything = prefixes[-1]
+    logs = {k: log_weight(k) for k in everything}
+    logs = {k: value for k, value in logs.items() if value is not None}
+    if not logs:
+        raise ValueError("knowledge is inconsistent with the mine count")
+    offset = max(logs.values())
+    weights = {k: math.exp(value - offset) for k, value in logs.items()}
+
+    normalizer = sum(everything[k] * weights[k] for k in weights)
+    probabilities = dict()
+    for index, (cells, _, per_cell) in enumerate(scaled):
+        others = convolve(prefixes[index], suffixes[index + 1])
+
+        # Weight of this component having k mines, given all the others
+        given = dict()
+        for k in range(len(cells) + 1):
+            given[k] = sum(count * weights.get(k + k_other, 0.0)
+                           for k_other, count in others.items())
+
+        for cell, distribution in zip(cells, per_cell):
+            mass = sum(count * given[k] for k, count in distribution.items())
+            probabilities[cell] = mass / normalizer
+
+    # Expected share of the remaining mines on each unconstrained cell
+    default = 0.0
+    if unconstrained:
+        default = sum(
+            everything[k] * weight * (mines_left - k) / unconstrained
+            for k, weight in weights.items()
+        ) / normalizer
+    return probabilities, default
+
+
+def components(sentences):
+    """
+    Splits sentences into independent groups that share no cells.
+    Returns a list of (cells, constraints) pairs, where constraints
+    are (cells, count) pairs and cells are ordered so that cells
+    sharing a sentence are close to each other.
+    """
+    by_cell = dict()
+    for sentence in sentences:
+        for cell in sentence.cells:
+            by_cell.setdefault(cell, []).append(sentence)
+
+    groups = []
+    visited = set()
+    for start in sorted(by_cell):
+        if start in visited:
+            continue
+
+        # Breadth-first search over cells sharing a sentence
+        cells = []
+        constraints = dict()
+        frontier = deque([start])
+        visited.add(start)
+        while frontier:
+            cell = frontier.popleft()
+            cells.append(cell)
+            for sentence in by_cell[cell]:
+                constraints[id(sentence)] = (sentence.cells, sentence.count)
+                for other in sorted(sentence.cells):
+                    if other not in visited:
+                        visited.add(other)
+                        frontier.append(other)
+        groups.append((cells, list(constraints.values())))
+    return groups
+
+
+def count_configurations(cells, constraints):
+    """
+    Counts the mine configurations of `cells` that satisfy every
+    (cells, count) constraint.
+
+    Returns (cells, total, per_cell), where `total` maps a number of
+    mines to the number of configurations with that many mines, and
+    `per_cell` gives the same distribution restricted to configurations
+    where each cell is a mine.
+
+    Cells are assigned in order; the state after each cell only holds
+    the counts still needed by constraints that have started but not
+    finished, so equal states are merged instead of explored again.
+
+    The number of states grows with the number of open constraints,
+    which stays small along a frontier that follows the edge of a
+    revealed region but not across a scattered one. Once any cell has
+    more than MAX_STATES states, the component is handed to
+    `estimate_configurations` instead, so counts are exact only for
+    components narrow enough to count in interactive time.
+    """
+    n = len(cells)
+    step = transitions(cells, constraints)
+
+    # Forward pass: configurations of the first i cells by state
+    layers = [{(): {0: 1}}]
+    for i in range(n):
+        layer = dict()
+        for state, distribution in layers[i].items():
+            for mine in (0, 1):
+                after = step(state, i, mine)
+                if after is not None:
+                    accumulate(layer.setdefault(after, dict()),
+                               distribution, mine)
+        if len(layer) > MAX_STATES:
+            return estimate_configurations(cells, constraints, step)
+        layers.append(layer)
+
+    # Backward pass: completions of the remaining cells from each state
+    suffix = {(): {0: 1}}
+    per_cell = [None] * n
+    for i in range(n - 1, -1, -1):
+        previous = dict()
+        marginal = dict()
+        for state, distribution in layers[i].items():
+            completions = dict()
+            for mine in (0, 1):
+                after = step(state, i, mine)
+                if after is None or after not in suffix:
+                    continue
+                accumulate(completions, suffix[after], mine)
+                if mine:
+                    shifted = {k + 1: count
+                               for k, count in suffix[after].items()}
+                    accumulate(marginal, convolve(distribution, shifted), 0)
+            if completions:
+                previous[state] = completions
+        per_cell[i] = marginal
+        suffix = previous
+
+    return cells, suffix.get((), dict()), per_cell
+
+
+def estimate_configurations(cells, constraints, step=None):
+    """
+    Approximates `count_configurations` for components too wide to count
+    exactly, in the same format.
+
+    Configurations are weighed without tracking their number of mines,
+    and only the BEAM states of greatest weight are kept after each cell,
+    which gives every cell's probability of being a mine; a cell left
+    without any weight gets the average density of its constraints. The
+    number of mines is then taken to be normally distributed around its
+    expected value, with each cell's probability in proportion to it.
+    """
+    n = len(cells)
+    if step is None:
+        step = transitions(cells, constraints)
+
+    # Fallback for cells the beam loses: mines per cell in constraints
+    densities = {cell: [] for cell in cells}
+    for constraint_cells, count in constraints:
+        for cell in constraint_cells:
+            densities[cell].append(count / len(constraint_cells))
+    probabilities = [sum(densities[cell]) / len(densities[cell])
+                     for cell in cells]
+
+    # Forward pass: relative weights of the kept states after each cell
+    layers = [{(): 1.0}]
+    for i in range(n):
+        layer = dict()
+        for state, weight in layers[i].items():
+            for mine in (0, 1):
+                after = step(state, i, mine)
+                if after is not None:
+                    layer[after] = layer.get(after, 0.0) + weight
+        if len(layer) > BEAM:
+            kept = sorted(layer, key=layer.get, reverse=True)[:BEAM]
+            layer = {state: layer[state] for state in kept}
+        largest = max(layer.values(), default=1.0)
+        layers.append({state: weight / largest
+                       for state, weight in layer.items()})
+
+    # Backward pass: weights of completing each kept state, and the share
+    # of every cell's weight that has it as a mine
+    suffix = {(): 1.0}
+    for i in range(n - 1, -1, -1):
+        previous = dict()
+        mass = [0.0, 0.0]
+        for state, weight in layers[i].items():
+            completions = 0.0
+            for mine in (0, 1):
+                after = step(state, i, mine)
+                if after is None or after not in suffix:
+                    continue
+                completions += suffix[after]
+                mass[mine] += weight * suffix[after]
+            if completions:
+                previous[state] = completions
+        if mass[0] + mass[1]:
+            probabilities[i] = mass[1] / (mass[0] + mass[1])
+        largest = max(previous.values(), default=1.0)
+        suffix = {state: weight / largest
+                  for state, weight in previous.items()}
+
+    mean = sum(probabilities)
+    if not mean:
+        return cells, {0: 1.0}, [dict() for _ in cells]
+    deviation = max(math.sqrt(sum(p * (1 - p) for p in probabilities)), 0.5)
+    low = max(0, math.floor(mean - 4 * deviation))
+    high = min(n, math.ceil(mean + 4 * deviation))
+    total = {k: math.exp(-((k - mean) / deviation) ** 2 / 2)
+             for k in range(low, high + 1)}
+
+    # Scale by the mean of `total` itself, so each cell keeps exactly
+    # its probability when the mine count is left free
+    mean = sum(k * count for k, count in total.items()) / sum(total.values())
+    per_cell = [{k: count * probability * k / mean
+                 for k, count in total.items()}
+                for probability in probabilities]
+    return cells, total, per_cell
+
+
+def transitions(cells, constraints):
+    """
+    Returns the step function of `count_configurations`, which takes the
+    state before cell i is assigned, the cell's position i, and whether
+    it is a mine, and returns the state after it, or None if that breaks
+    a constraint.
+    """
+    n = len(cells)
+    position = {cell: i for i, cell in enumerate(cells)}
+    positions = [sorted(position[cell] for cell in constraint_cells)
+                 for constraint_cells, _ in constraints]
+    counts = [count for _, count in constraints]
+
+    # Constraints starting, touching and ending at each cell
+    starting = [[] for _ in range(n)]
+    touching = [[] for _ in range(n)]
+    ending = [[] for _ in range(n)]
+    left = dict()
+    for c, cells_at in enumerate(positions):
+        starting[cells_at[0]].append(c)
+        ending[cells_at[-1]].append(c)
+        for index, i in enumerate(cells_at):
+            touching[i].append(c)
+            left[c, i] = len(cells_at) - index - 1
+
+    # Constraints active before each cell is assigned
+    active = [()]
+    current = set()
+    for i in range(n):
+        current.update(starting[i])
+        current.difference_update(ending[i])
+        active.append(tuple(sorted(current)))
+
+    def step(state, i, mine):
+        """Returns the state after assigning cell i, or None if invalid."""
+        remaining = dict(zip(active[i], state))
+        for c in starting[i]:
+            remaining[c] = counts[c]
+        for c in touching[i]:
+            r = remaining[c] - mine
+            if r < 0 or r > left[c, i]:
+                return None
+            remaining[c] = r
+        return tuple(remaining[c] for c in active[i + 1])
+
+    return step
+
+
+def accumulate(target, distribution, shift):
+    """Adds `distribution`, shifted by `shift` mines, into `target`."""
+    for k, count in distribution.items():
+        target[k + shift] = target.get(k + shift, 0) + count
+
+
+def convolve(a, b):
+    """Returns the distribution of the sum of two mine counts."""
+    result = dict()
+    for k1, count1 in a.items():
+        for k2, count2 in b.items():
+            result[k1 + k2] = result.get(k1 + k2, 0) + count1 * count2
+    return result
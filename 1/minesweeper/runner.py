@@ -8,6 +8,11 @@ HEIGHT = 8
 WIDTH = 8
 MINES = 8
 
+# Optional seed, so the same first click always gives the same board
+if len(sys.argv) > 2:
+    sys.exit("Usage: python runner.py [seed]")
+SEED = int(sys.argv[1]) if len(sys.argv) > 1 else None
+
 # Colors
 BLACK = (0, 0, 0)
 GRAY = (180, 180, 180)
@@ -37,9 +42,10 @@ flag = pygame.transform.scale(flag, (cell_size, cell_size))
 mine = pygame.image.load("assets/images/mine.png")
 mine = pygame.transform.scale(mine, (cell_size, cell_size))
 
-# Create game and AI agent
-game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
+# Create AI agent; the game is created on the first reveal, so that the
+# first cell revealed is never a mine
+game = None
+ai = MinesweeperAI(height=HEIGHT, width=WIDTH, mines=MINES)
 
 # Keep track of revealed cells, flagged cells, and if a mine was hit
 revealed = set()
@@ -114,7 +120,7 @@ while True:
             pygame.draw.rect(screen, WHITE, rect, 3)
 
             # Add a mine, flag, or number if needed
-            if game.is_mine((i, j)) and lost:
+            if lost and game.is_mine((i, j)):
                 screen.blit(mine, rect)
             elif (i, j) in flags:
                 screen.blit(flag, rect)
@@ -153,7 +159,8 @@ while True:
     screen.blit(buttonText, buttonRect)
 
     # Display text
-    text = "Lost" if lost else "Won" if game.mines == flags else ""
+    won = game is not None and game.mines == flags
+    text = "Lost" if lost else "Won" if won else ""
     text = mediumFont.render(text, True, WHITE)
     textRect = text.get_rect()
     textRect.center = ((5 / 6) * width, (2 / 3) * height)
@@ -182,12 +189,12 @@ while True:
         if aiButton.collidepoint(mouse) and not lost:
             move = ai.make_safe_move()
             if move is None:
-                move = ai.make_random_move()
+                move = ai.make_guess_move()
                 if move is None:
                     flags = ai.mines.copy()
                     print("No moves left to make.")
                 else:
-                    print("No known safe moves, AI making random move.")
+                    print("No known safe moves, AI making best guess.")
             else:
                 print("AI making safe move.")
                 print(f"Moves is: {move}")
@@ -195,8 +202,8 @@ while True:
 
         # Reset game state
         elif resetButton.collidepoint(mouse):
-            game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-            ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
+            game = None
+            ai = MinesweeperAI(height=HEIGHT, width=WIDTH, mines=MINES)
             revealed = set()
             flags = set()
             lost = False
@@ -213,11 +220,14 @@ while True:
 
     # Make move and update AI knowledge
     if move:
+        if game is None:
+            game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES,
+                               seed=SEED, first_click=move)
         if game.is_mine(move):
             lost = True
         else:
-            nearby = game.nearby_mines(move)
-            revealed.add(move)
-            ai.add_knowledge(move, nearby)
+            region = game.reveal(move, revealed)
+            revealed.update(region)
+            ai.add_knowledge_many(region)
 
     pygame.display.flip()
@@ -0,0 +1,116 @@
+import random
+import sys
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+GAMES = 1000
+BOARDS = [(8, 8), (16, 16), (16, 30)]
+DENSITIES = [0.125, 0.16, 0.21]
+
+
+def main():
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python simulate.py [games] [processes]")
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else GAMES
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    print(f"{'board':>9} {'mines':>6} {'games':>6} {'win rate':>9} "
+          f"{'moves/s':>9} {'p50':>8} {'p90':>8} {'p99':>8}")
+    for height, width in BOARDS:
+        for density in DENSITIES:
+            mines = round(height * width * density)
+            report = simulate(height, width, mines, games, processes)
+            latencies = report["inference_latencies"]
+            print(f"{height:>4}x{width:<4} {mines:>6} {games:>6} "
+                  f"{report['win_rate']:>8.1%} "
+                  f"{report['moves_per_second']:>9.0f} "
+                  f"{percentile(latencies, 50) * 1000:>6.2f}ms "
+                  f"{percentile(latencies, 90) * 1000:>6.2f}ms "
+                  f"{percentile(latencies, 99) * 1000:>6.2f}ms")
+
+
+def simulate(height, width, mines, games, processes=None):
+    """
+    Plays `games` games on boards of the given size across a pool
+    of `processes` worker processes (one per CPU by default).
+
+    Returns a dictionary with the win rate, the number of moves made
+    per second of AI time, and the time each `add_knowledge` call took,
+    in seconds.
+    """
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        results = list(executor.map(
+            play, [height] * games, [width] * games, [mines] * games,
+            range(games), chunksize=max(1, games // 64)
+        ))
+
+    moves = sum(len(move_times) for _, move_times, _ in results)
+    elapsed = sum(sum(move_times) for _, move_times, _ in results)
+    return {
+        "win_rate": sum(won for won, _, _ in results) / games,
+        "moves_per_second": moves / elapsed if elapsed else 0.0,
+        "inference_latencies": [
+            latency
+            for _, _, inference_times in results
+            for latency in inference_times
+        ]
+    }
+
+
+def play(height, width, mines, seed):
+    """
+    Plays one game of Minesweeper with the AI, without a display.
+    Returns whether the AI won, the time it took to choose and learn
+    from each move, and the time spent in `add_knowledge` for each
+    move, in seconds.
+    """
+    random.seed(seed)
+
+    # Open in the middle of the board, which is guaranteed to be safe
+    first = (height // 2, width // 2)
+    game = Minesweeper(height=height, width=width, mines=mines, seed=seed,
+                       first_click=first)
+    ai = MinesweeperAI(height=height, width=width, mines=mines)
+    safe_cells = height * width - mines
+    revealed = set()
+    move_times = []
+    inference_times = []
+
+    region = game.reveal(first)
+    revealed.update(region)
+    ai.add_knowledge_many(region)
+
+    while len(revealed) < safe_cells:
+        start = time.perf_counter()
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_guess_move()
+        if move is None or game.is_mine(move):
+            move_times.append(time.perf_counter() - start)
+            return False, move_times, inference_times
+
+        region = game.reveal(move, revealed)
+        revealed.update(region)
+        inference = time.perf_counter()
+        ai.add_knowledge_many(region)
+        end = time.perf_counter()
+        move_times.append(end - start)
+        inference_times.append(end - inference)
+
+    return True, move_times, inference_times
+
+
+def percentile(values, p):
+    """Returns the p-th percentile of a list of values."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, round(p / 100 * (len(values) - 1)))
+    return values[index]
+
+
+if __name__ == "__main__":
+    main()
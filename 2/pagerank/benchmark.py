@@ -0,0 +1,326 @@
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from cache import cached_crawl
+from crawler import crawl_to_file, read_graph
+from engine import (LinkMatrix, SOLVERS, personalized_pagerank,
+                    update_pagerank)
+from pagerank import DAMPING, Corpus, crawl, iterate_pagerank, sample_pagerank
+from sampling import Surfer, parallel_pagerank, vectorized_pagerank
+
+SIZES = [1000, 10000, 100000, 1000000]
+EXPONENT = 2.1
+DANGLING = 0.05
+SEED = 0
+
+# Links inserted and deleted in an edit batch, and teleport vectors solved
+# together by personalized_pagerank
+EDITS = 100
+TOPICS = 8
+
+# Samples drawn by the NumPy samplers, and by sample_pagerank
+SAMPLES = 1000000
+SLOW_SAMPLES = 10000
+
+# Largest graphs written out as HTML, and run through pure Python engines
+MAX_HTML_PAGES = 10000
+MAX_SLOW_SAMPLE_PAGES = 1000
+MAX_ITERATE_PAGES = 10000
+MAX_GAUSS_SEIDEL_PAGES = 100000
+
+# Largest difference from the reference ranks each kind of engine may have
+EXACT_TOLERANCE = 1e-6
+ITERATE_TOLERANCE = 1e-3
+SAMPLE_DEVIATIONS = 5
+
+# Small graphs, as (pages, sources, targets), that once broke a solver
+REGRESSIONS = [
+    # Quadratic extrapolation cancelled these ranks out to NaN
+    (31, [3, 5, 16, 18, 30], [13, 0, 4, 29, 12]),
+]
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python benchmark.py [sizes]")
+    sizes = SIZES
+    if len(sys.argv) > 1:
+        sizes = [int(size) for size in sys.argv[1].split(",")]
+
+    print(f"{'pages':>8} {'links':>9} {'engine':<22} {'time':>9} "
+          f"{'memory':>9} {'max error':>10}")
+    failed = False
+    for n, sources, targets in REGRESSIONS:
+        results = check_solvers(n, sources, targets)
+        failed = report(n, len(sources), results) or failed
+    for n in sizes:
+        links, results = benchmark(n)
+        failed = report(n, links, results) or failed
+    if failed:
+        sys.exit("Some engines disagree with the reference ranks")
+
+
+def report(n, links, results):
+    """
+    Prints a row for every result of a graph with `n` pages and `links`
+    links. Returns whether any engine disagreed with the reference.
+    """
+    failed = False
+    for name, elapsed, peak, error, ok in results:
+        error = "-" if error is None else f"{error:.2e}"
+        print(f"{n:>8} {links:>9} {name:<22} {elapsed:>8.3f}s "
+              f"{peak / 2 ** 20:>7.1f}MB {error:>10}"
+              f"{'' if ok else '  DISAGREES'}")
+        failed = failed or not ok
+    return failed
+
+
+def check_solvers(n, sources, targets):
+    """
+    Runs every sparse solver on a small graph with `n` pages, given by
+    its link sources and targets, and returns result tuples as
+    `benchmark` does.
+    """
+    matrix = LinkMatrix(range(n), sources, targets)
+    reference = SOLVERS["power"](matrix, DAMPING, 1e-12)
+    results = []
+    for name, solver in SOLVERS.items():
+        ranks, elapsed, peak = measure(solver, matrix, DAMPING)
+        results.append(compare(name, ranks, reference, elapsed, peak,
+                               EXACT_TOLERANCE))
+    return results
+
+
+def benchmark(n):
+    """
+    Runs every engine on a synthetic power-law graph with `n` pages.
+    Returns the number of links in the graph and a list of (engine,
+    seconds, peak bytes allocated, largest difference from the reference
+    ranks, whether that difference is within tolerance) tuples. Crawlers
+    report no difference, but must recover exactly the generated graph.
+    """
+    pages, sources, targets = power_law_graph(n, SEED)
+    corpus = graph_corpus(pages, sources, targets)
+    results = []
+
+    matrix, elapsed, peak = measure(LinkMatrix, pages, sources, targets)
+    results.append(("LinkMatrix", elapsed, peak, None, True))
+    reference = SOLVERS["power"](matrix, DAMPING, 1e-12)
+
+    # Crawl the graph back from HTML files
+    if n <= MAX_HTML_PAGES:
+        with tempfile.TemporaryDirectory() as directory:
+            results.extend(benchmark_crawlers(directory, corpus, pages,
+                                              sources, targets))
+
+    # Exact solvers, then the iteration and samplers of pagerank.py
+    for name, solver in SOLVERS.items():
+        if name == "gauss-seidel" and n > MAX_GAUSS_SEIDEL_PAGES:
+            continue
+        ranks, elapsed, peak = measure(solver, matrix, DAMPING)
+        results.append(compare(name, ranks, reference, elapsed, peak,
+                               EXACT_TOLERANCE))
+
+    results.extend(benchmark_updates(matrix, reference, sources, targets))
+
+    if n <= MAX_ITERATE_PAGES:
+        ranks, elapsed, peak = measure(iterate_pagerank, Corpus(corpus),
+                                       DAMPING)
+        results.append(compare("iterate_pagerank",
+                               [ranks[page] for page in pages], reference,
+                               elapsed, peak, ITERATE_TOLERANCE))
+
+    if n <= MAX_SLOW_SAMPLE_PAGES:
+        random.seed(SEED)
+        ranks, elapsed, peak = measure(sample_pagerank, corpus, DAMPING,
+                                       SLOW_SAMPLES)
+        results.append(compare("sample_pagerank",
+                               [ranks[page] for page in pages], reference,
+                               elapsed, peak,
+                               sample_tolerance(reference, SLOW_SAMPLES)))
+
+    surfer = Surfer(matrix, DAMPING)
+    counts, elapsed, peak = measure(surfer.visits, SAMPLES, 1000, SEED)
+    results.append(compare("Surfer", counts / SAMPLES, reference, elapsed,
+                           peak, sample_tolerance(reference, SAMPLES)))
+
+    # The same sampler from a corpus dictionary, in one process
+    ranks, elapsed, peak = measure(vectorized_pagerank, corpus, DAMPING,
+                                   SAMPLES, 1000, SEED)
+    results.append(compare("vectorized_pagerank",
+                           [ranks[page] for page in pages], reference,
+                           elapsed, peak,
+                           sample_tolerance(reference, SAMPLES)))
+
+    (ranks, _), elapsed, peak = measure(parallel_pagerank, corpus, DAMPING,
+                                        SAMPLES, None, 16, 1000, SEED)
+    results.append(compare("parallel_pagerank",
+                           [ranks[page] for page in pages], reference,
+                           elapsed, peak,
+                           sample_tolerance(reference, SAMPLES)))
+    return len(sources), results
+
+
+def benchmark_updates(matrix, reference, sources, targets):
+    """
+    Times updating the ranks after a batch of EDITS random link
+    insertions and deletions, against solving the edited graph from
+    scratch, and times TOPICS uniform teleport vectors solved together,
+    each of which must give the ordinary ranks. Returns result tuples as
+    `benchmark` does.
+    """
+    rng = np.random.default_rng(SEED)
+    deleted = rng.choice(len(sources), min(EDITS, len(sources)),
+                         replace=False)
+    deletions = list(zip(sources[deleted].tolist(),
+                         targets[deleted].tolist()))
+    insertions = rng.integers(0, matrix.n, (EDITS, 2)).tolist()
+    edited = matrix.edit(insertions, deletions)
+    expected = SOLVERS["power"](edited, DAMPING, 1e-12)
+    results = []
+
+    ranks, elapsed, peak = measure(SOLVERS["power"], edited, DAMPING)
+    results.append(compare("power (edited)", ranks, expected, elapsed, peak,
+                           EXACT_TOLERANCE))
+    (_, ranks), elapsed, peak = measure(update_pagerank, matrix, reference,
+                                        DAMPING, insertions, deletions)
+    results.append(compare("update_pagerank", ranks, expected, elapsed,
+                           peak, EXACT_TOLERANCE))
+
+    teleports = np.ones((matrix.n, TOPICS))
+    ranks, elapsed, peak = measure(personalized_pagerank, matrix, teleports,
+                                   DAMPING)
+    results.append(compare(f"personalized (K={TOPICS})", ranks,
+                           reference[:, None], elapsed, peak,
+                           EXACT_TOLERANCE))
+    return results
+
+
+def benchmark_crawlers(directory, corpus, pages, sources, targets):
+    """
+    Writes a graph as HTML pages in `directory` and times crawling it
+    with `crawl`, `crawl_to_file`, and `cached_crawl` without and with
+    a cache. Returns result tuples as `benchmark` does.
+    """
+    write_corpus(directory, pages, sources, targets)
+    results = []
+
+    found, elapsed, peak = measure(crawl, directory)
+    results.append(("crawl", elapsed, peak, None, found == corpus))
+
+    output = os.path.join(directory, "graph.bin")
+    _, elapsed, peak = measure(crawl_to_file, directory, output)
+    names, found_sources, found_targets = read_graph(output)
+    found = graph_corpus(names, found_sources, found_targets)
+    results.append(("crawl_to_file", elapsed, peak, None, found == corpus))
+
+    cache = os.path.join(directory, "cache.npz")
+
+    def cold():
+        if os.path.exists(cache):
+            os.remove(cache)
+        return cached_crawl(directory, cache)
+
+    found, elapsed, peak = measure(cold)
+    results.append(("cached_crawl (cold)", elapsed, peak, None,
+                    found == corpus))
+    found, elapsed, peak = measure(cached_crawl, directory, cache)
+    results.append(("cached_crawl (warm)", elapsed, peak, None,
+                    found == corpus))
+    return results
+
+
+def power_law_graph(n, seed=None):
+    """
+    Returns the page names and link sources and targets of a random
+    graph with `n` pages whose out- and in-degrees follow power laws:
+    out-degrees are Zipf-distributed with exponent EXPONENT, apart from
+    a DANGLING share of pages without links, and targets are chosen in
+    proportion to Pareto-distributed page popularities.
+    """
+    rng = np.random.default_rng(seed)
+    degrees = np.minimum(rng.zipf(EXPONENT, n), n - 1)
+    degrees[rng.random(n) < DANGLING] = 0
+    popularity = np.cumsum(rng.pareto(EXPONENT - 1, n) + 1)
+
+    sources = np.repeat(np.arange(n), degrees)
+    targets = np.searchsorted(popularity,
+                              rng.random(len(sources)) * popularity[-1])
+    targets = np.minimum(targets, n - 1)
+
+    # Drop self-links and repeated links
+    keys = np.unique(sources * n + targets)
+    keys = keys[keys // n != keys % n]
+    pages = [f"{i}.html" for i in range(n)]
+    return pages, keys // n, keys % n
+
+
+def graph_corpus(pages, sources, targets):
+    """
+    Returns a graph as a corpus dictionary, in the format of `crawl`.
+    """
+    corpus = {page: set() for page in pages}
+    for source, target in zip(sources.tolist(), targets.tolist()):
+        corpus[pages[source]].add(pages[target])
+    return corpus
+
+
+def write_corpus(directory, pages, sources, targets):
+    """
+    Writes one HTML file per page into `directory`, linking to the
+    page's targets.
+    """
+    corpus = graph_corpus(pages, sources, targets)
+    for page in pages:
+        with open(os.path.join(directory, page), "w") as f:
+            f.write(f"<!DOCTYPE html>\n<html>\n<head><title>{page}</title>"
+                    f"</head>\n<body>\n<h1>{page}</h1>\n")
+            for link in sorted(corpus[page]):
+                f.write(f'<p><a href="{link}">{link}</a></p>\n')
+            f.write("</body>\n</html>\n")
+
+
+def measure(function, *args):
+    """
+    Calls `function` with `args` twice: once timed, and once with
+    allocations traced. Returns the result, the wall time in seconds,
+    and the peak memory allocated by the traced call, in bytes. Memory
+    allocated by worker processes is not included.
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def compare(name, ranks, reference, elapsed, peak, tolerance):
+    """
+    Returns a result tuple for ranks that should be within `tolerance`
+    of the reference ranks on every page.
+    """
+    error = np.abs(np.asarray(ranks) - reference).max()
+    return name, elapsed, peak, error, error <= tolerance
+
+
+def sample_tolerance(reference, samples):
+    """
+    Returns how far estimates from `samples` samples may stray from the
+    reference ranks: SAMPLE_DEVIATIONS standard deviations of the
+    estimate of the highest-ranked page, were its samples independent.
+    """
+    return SAMPLE_DEVIATIONS * np.sqrt(reference.max() / samples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import hashlib
+import os
+
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+
+from crawler import CHUNKSIZE, page_links, walk
+
+CACHE_DIRECTORY = "pagerank"
+PARALLEL_PAGES = 256
+
+
+def cached_crawl(directory, cache=None, stats=None, recursive=False):
+    """
+    Return the corpus dictionary of `directory`, as `crawl` does, using
+    a link-graph cache file (by default one per directory in the user's
+    cache directory, see `cache_path`, so the corpus itself is never
+    written to) so that only pages added or modified since the last
+    crawl are parsed again.
+    Like `crawl`, only pages directly in the directory are included,
+    unless `recursive` is true.
+
+    The cache records the directory it was made for, each page's size
+    and modification time, and every page's resolved links in CSR form.
+    Links to pages outside the corpus are kept too, since such a page
+    may be added later. If `stats` is given, the number of pages parsed
+    and reused is stored in it. If the cache cannot be written, as in a
+    read-only directory, the crawl is still returned.
+    """
+    directory = os.path.abspath(directory)
+    if cache is None:
+        cache = cache_path(directory)
+    cached = read_cache(cache, directory)
+
+    # Reuse the links of every page whose file has not changed
+    pages = walk(directory, recursive)
+    links = dict()
+    stamps = dict()
+    changed = []
+    for page in pages:
+        info = os.stat(os.path.join(directory, page))
+        stamps[page] = (info.st_mtime_ns, info.st_size)
+        if page in cached and cached[page][0] == stamps[page]:
+            links[page] = cached[page][1]
+        else:
+            changed.append(page)
+
+    if len(changed) < PARALLEL_PAGES:
+        parsed = [page_links(directory, page) for page in changed]
+    else:
+        with ProcessPoolExecutor() as executor:
+            parsed = list(executor.map(page_links, [directory] * len(changed),
+                                       changed, chunksize=CHUNKSIZE))
+    links.update(zip(changed, parsed))
+
+    if stats is not None:
+        stats["parsed"] = len(changed)
+        stats["reused"] = len(pages) - len(changed)
+    if changed or len(cached) != len(pages):
+        # Without a writable cache the next crawl just starts over
+        try:
+            write_cache(cache, directory, pages, stamps, links)
+        except OSError:
+            pass
+
+    # Only include links to other pages in the corpus
+    return {
+        page: set(link for link in links[page] if link in links)
+        for page in pages
+    }
+
+
+def cache_path(directory):
+    """
+    Returns the default cache file for `directory`: a file named after a
+    hash of the directory's absolute path, in CACHE_DIRECTORY under
+    $XDG_CACHE_HOME (~/.cache by default).
+    """
+    root = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    name = hashlib.sha1(os.path.abspath(directory).encode()).hexdigest()
+    return os.path.join(root, CACHE_DIRECTORY, name + ".npz")
+
+
+def read_cache(cache, directory):
+    """
+    Returns a dictionary mapping each page in the cache file to its
+    (modification time, size) pair and list of links, or an empty one if
+    there is no usable cache for `directory`.
+    """
+    try:
+        with np.load(cache, allow_pickle=False) as data:
+            if str(data["directory"]) != directory:
+                return dict()
+            pages = data["pages"].tolist()
+            names = data["names"].tolist()
+            stamps = data["stamps"].tolist()
+            indptr = data["indptr"].tolist()
+            indices = data["indices"].tolist()
+    except (OSError, ValueError, KeyError):
+        return dict()
+
+    return {
+        page: (tuple(stamps[i]),
+               [names[k] for k in indices[indptr[i]:indptr[i + 1]]])
+        for i, page in enumerate(pages)
+    }
+
+
+def write_cache(cache, directory, pages, stamps, links):
+    """
+    Writes the links of every page to the cache file, with each link
+    target stored once in a table of names.
+    """
+    names = sorted(set().union(*links.values())) if links else []
+    ids = {name: k for k, name in enumerate(names)}
+    indptr = np.zeros(len(pages) + 1, dtype=np.int64)
+    indices = []
+    for i, page in enumerate(pages):
+        indices.extend(sorted(ids[link] for link in links[page]))
+        indptr[i + 1] = len(indices)
+
+    # Write to a temporary file first, so a cache is never half written
+    os.makedirs(os.path.dirname(os.path.abspath(cache)), exist_ok=True)
+    temporary = cache + ".tmp"
+    with open(temporary, "wb") as f:
+        np.savez(
+            f,
+            directory=np.array(directory),
+            pages=np.array(pages, dtype=str),
+            stamps=np.array([stamps[page] for page in pages],
+                            dtype=np.int64).reshape(-1, 2),
+            names=np.array(names, dtype=str),
+            indptr=indptr,
+            indices=np.array(indices, dtype=np.int32)
+        )
+    os.replace(temporary, cache)
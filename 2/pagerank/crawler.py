@@ -0,0 +1,151 @@
+import os
+import posixpath
+import re
+import struct
+import sys
+
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+
+MAGIC = b"PAGERANK"
+HEADER = struct.Struct("<8sQQ")
+CHUNK_SIZE = 1 << 16
+CHUNKSIZE = 64
+MAX_CARRY = 1 << 12
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+
+def main():
+    if len(sys.argv) not in (3, 4):
+        sys.exit("Usage: python crawler.py corpus output [processes]")
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    pages, links = crawl_to_file(sys.argv[1], sys.argv[2], processes)
+    print(f"Wrote {pages} pages and {links} links to {sys.argv[2]}")
+
+
+def walk(directory, recursive=True):
+    """
+    Returns the paths of all HTML pages under `directory`, searched
+    recursively unless `recursive` is false, relative to it and with
+    "/" as the separator.
+    """
+    pages = []
+    for root, dirs, files in os.walk(directory):
+        if not recursive:
+            dirs.clear()
+        dirs.sort()
+        prefix = os.path.relpath(root, directory).replace(os.sep, "/")
+        prefix = "" if prefix == "." else prefix + "/"
+        for filename in sorted(files):
+            if filename.endswith(".html"):
+                pages.append(prefix + filename)
+    return pages
+
+
+def extract_links(path, chunk_size=CHUNK_SIZE):
+    """
+    Returns the set of link targets in the HTML file at `path`, reading
+    it `chunk_size` characters at a time.
+
+    A tag left open at the end of a chunk, from its last "<" on, is kept
+    for the next one, so that a link split between two chunks is still
+    found. Closed tags are not kept, and neither are open ones longer
+    than MAX_CARRY characters, so each chunk is scanned about once.
+    """
+    links = set()
+    with open(path) as f:
+        carry = ""
+        while True:
+            chunk = f.read(chunk_size)
+            buffer = carry + chunk
+            links.update(LINK.findall(buffer))
+            if not chunk:
+                return links
+            start = buffer.rfind("<")
+            if start < 0 or buffer.find(">", start) != -1:
+                carry = ""
+            else:
+                carry = buffer[start:][:MAX_CARRY]
+
+
+def page_links(directory, page):
+    """
+    Returns the set of pages linked to by `page`, with each link
+    resolved against the page's own directory.
+    """
+    base = posixpath.dirname(page)
+    links = set()
+    for link in extract_links(os.path.join(directory, page)):
+
+        # Plain file names in the top directory need no resolving
+        if base or "/" in link:
+            link = posixpath.normpath(posixpath.join(base, link))
+        links.add(link)
+    return links - {page}
+
+
+def crawl_to_file(directory, path, processes=None):
+    """
+    Crawls every HTML page under `directory` in a pool of `processes`
+    worker processes (one per CPU by default), and writes the link graph
+    to the edge-list file at `path` as pages are parsed.
+
+    The file holds a header, the page names, and then every link between
+    pages of the corpus as a pair of little-endian 32-bit page numbers.
+    Returns the number of pages and of links written.
+    """
+    pages = walk(directory)
+    ids = {page: i for i, page in enumerate(pages)}
+    names = "\n".join(pages).encode()
+    edges = 0
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(pages), len(names)))
+        f.write(names)
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = executor.map(page_links, [directory] * len(pages),
+                                   pages, chunksize=CHUNKSIZE)
+
+            # Results come back in page order, so each page's links are
+            # written as soon as they are parsed
+            for source, links in enumerate(results):
+                targets = sorted(ids[link] for link in links if link in ids)
+                pairs = np.empty((len(targets), 2), dtype="<u4")
+                pairs[:, 0] = source
+                pairs[:, 1] = targets
+                pairs.tofile(f)
+                edges += len(targets)
+    return len(pages), edges
+
+
+def read_graph(path):
+    """
+    Reads an edge-list file written by `crawl_to_file`.
+    Returns the list of page names and arrays of link sources and
+    targets, as positions in that list.
+    """
+    with open(path, "rb") as f:
+        magic, n, size = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a link graph file")
+        names = f.read(size).decode()
+        pages = names.split("\n") if n else []
+        pairs = np.fromfile(f, dtype="<u4").reshape(-1, 2)
+    return pages, pairs[:, 0], pairs[:, 1]
+
+
+def load_corpus(path):
+    """
+    Reads an edge-list file written by `crawl_to_file` into a corpus
+    dictionary, in the format returned by `crawl`.
+    """
+    pages, sources, targets = read_graph(path)
+    corpus = {page: set() for page in pages}
+    for source, target in zip(sources.tolist(), targets.tolist()):
+        corpus[pages[source]].add(pages[target])
+    return corpus
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,458 @@
+import numpy as np
+
+TOLERANCE = 1e-10
+MAX_ITERATIONS = 1000
+DENSE = 8
+EXTRAPOLATE = 10
+EPSILON = 1e-15
+ADAPTIVE = 10
+
+
+class LinkMatrix():
+    """
+    Link structure of a corpus as a sparse matrix in CSR form.
+
+    Row i lists the pages linking to page i (its inlinks), and each entry
+    holds 1 / out-degree of the linking page, so that multiplying by a
+    rank vector spreads every page's rank evenly over its links. Pages
+    without links (dangling pages) are kept apart, since they link to
+    every page.
+    """
+
+    def __init__(self, pages, sources, targets):
+        """
+        Builds the matrix for `pages` from parallel arrays of link
+        sources and targets, given as integer positions in `pages`.
+        """
+        self.pages = list(pages)
+        self.n = len(self.pages)
+
+        # Page positions fit in 32 bits for any corpus under 2^31 pages
+        dtype = np.int32 if self.n < 2 ** 31 else np.int64
+        sources = np.asarray(sources, dtype=dtype)
+        targets = np.asarray(targets, dtype=dtype)
+
+        self.out_degree = np.bincount(sources, minlength=self.n)
+        self.dangling = self.out_degree == 0
+
+        # Sort links by target so that each row is contiguous
+        order = np.argsort(targets, kind="stable")
+        self.indices = sources[order]
+        self.rows = targets[order]
+        self.indptr = np.zeros(self.n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.rows, minlength=self.n),
+                  out=self.indptr[1:])
+        self.data = 1 / self.out_degree[self.indices]
+        self.outlinks = None
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Builds the matrix for a dictionary mapping each page to the set
+        of pages it links to, reusing the index of a Corpus if given one.
+        """
+        if hasattr(corpus, "forward"):
+
+            # An indexed Corpus already numbers its pages and links
+            pages = corpus.pages
+            forward = corpus.forward
+        else:
+            pages = sorted(corpus)
+            ids = {page: i for i, page in enumerate(pages)}
+            forward = [[ids[link] for link in corpus[page]] for page in pages]
+        sources = [i for i, links in enumerate(forward) for _ in links]
+        targets = [j for links in forward for j in links]
+        return cls(pages, sources, targets)
+
+    def links(self):
+        """
+        Returns the outlinks of every page in CSR form, as the offset of
+        each page's first link and the targets of all links, contiguous
+        by source page. Built on first use.
+        """
+        if self.outlinks is None:
+            order = np.argsort(self.indices, kind="stable")
+            start = np.zeros(self.n + 1, dtype=np.int64)
+            np.cumsum(self.out_degree, out=start[1:])
+            self.outlinks = (start, self.rows[order])
+        return self.outlinks
+
+    def edit(self, insertions=(), deletions=()):
+        """
+        Returns a new LinkMatrix over the same pages with the links in
+        `insertions` added and those in `deletions` removed, each given
+        as (source, target) pairs of page positions.
+        """
+        # Links are found in their target's row, in O(in-degree) each
+        keep = np.ones(len(self.indices), dtype=bool)
+        for source, target in deletions:
+            row = slice(self.indptr[target], self.indptr[target + 1])
+            keep[row] &= self.indices[row] != source
+        added = set()
+        for source, target in insertions:
+            row = slice(self.indptr[target], self.indptr[target + 1])
+            if source != target and source not in self.indices[row][keep[row]]:
+                added.add((source, target))
+
+        added = np.array(sorted(added), dtype=np.int64).reshape(-1, 2)
+        sources = np.concatenate([self.indices[keep], added[:, 0]])
+        targets = np.concatenate([self.rows[keep], added[:, 1]])
+        return LinkMatrix(self.pages, sources, targets)
+
+    def dot(self, ranks):
+        """
+        Returns, for each page, the rank flowing into it through links.
+        """
+        return np.bincount(self.rows, weights=self.data * ranks[self.indices],
+                           minlength=self.n)
+
+
+def step(matrix, ranks, damping_factor):
+    """
+    Returns the rank vector after one power iteration step: rank from
+    links, plus the share of random jumps and of dangling pages, which
+    spread their rank over every page.
+    """
+    spread = (1 - damping_factor + damping_factor
+              * ranks[matrix.dangling].sum()) / matrix.n
+    return damping_factor * matrix.dot(ranks) + spread
+
+
+def power_iteration(matrix, damping_factor, tolerance=TOLERANCE,
+                    max_iterations=MAX_ITERATIONS, trace=None):
+    """
+    Returns the PageRank vector of a LinkMatrix, computed by repeated
+    sparse matrix-vector products from a uniform start until the L1
+    norm of the change between iterations drops below `tolerance`.
+
+    If `trace` is given, an (iteration, residual) pair is appended to
+    it after every iteration, as with every solver below.
+    """
+    n = matrix.n
+    ranks = np.full(n, 1 / n)
+    for iteration in range(1, max_iterations + 1):
+        updated = step(matrix, ranks, damping_factor)
+        residual = np.abs(updated - ranks).sum()
+        ranks = updated
+        if trace is not None:
+            trace.append((iteration, residual))
+        if residual < tolerance:
+            break
+    return ranks
+
+
+def gauss_seidel(matrix, damping_factor, tolerance=TOLERANCE,
+                 max_iterations=MAX_ITERATIONS, trace=None):
+    """
+    Returns the PageRank vector of a LinkMatrix computed with
+    Gauss-Seidel sweeps, which update each page in place so that later
+    pages in a sweep already see the new values.
+
+    The rank of dangling pages is kept up to date during a sweep, and
+    the vector is normalized after each one. Sweeps run page by page in
+    Python, so each is much slower than a power iteration step.
+    """
+    n = matrix.n
+    d = damping_factor
+    indptr = matrix.indptr.tolist()
+    indices = matrix.indices.tolist()
+    data = (d * matrix.data).tolist()
+    dangling = matrix.dangling.tolist()
+    ranks = [1 / n] * n
+    for iteration in range(1, max_iterations + 1):
+        previous = list(ranks)
+        spread = sum(r for r, empty in zip(ranks, dangling) if empty) * d / n
+        for i in range(n):
+            value = (1 - d) / n + spread
+            for k in range(indptr[i], indptr[i + 1]):
+                value += data[k] * ranks[indices[k]]
+            if dangling[i]:
+                spread += (value - ranks[i]) * d / n
+            ranks[i] = value
+
+        total = sum(ranks)
+        ranks = [r / total for r in ranks]
+        residual = sum(abs(r - p) for r, p in zip(ranks, previous))
+        if trace is not None:
+            trace.append((iteration, residual))
+        if residual < tolerance:
+            break
+    return np.array(ranks)
+
+
+def extrapolated_iteration(matrix, damping_factor, tolerance=TOLERANCE,
+                           max_iterations=MAX_ITERATIONS, trace=None):
+    """
+    Returns the PageRank vector of a LinkMatrix computed by power
+    iteration with quadratic extrapolation every EXTRAPOLATE iterations.
+
+    The last four iterates are assumed to differ from the limit mostly
+    along the two leading non-principal eigenvectors; a least-squares
+    fit of those directions cancels them out, which speeds convergence
+    when the damping factor is close to 1.
+    """
+    n = matrix.n
+    ranks = np.full(n, 1 / n)
+    history = [ranks]
+    for iteration in range(1, max_iterations + 1):
+        updated = step(matrix, ranks, damping_factor)
+        history = history[-3:] + [updated]
+        if iteration % EXTRAPOLATE == 0 and len(history) == 4:
+            extrapolated = extrapolate(*history)
+            if extrapolated is not None:
+                updated = extrapolated
+                history = [updated]
+
+        residual = np.abs(updated - ranks).sum()
+        ranks = updated
+        if trace is not None:
+            trace.append((iteration, residual))
+        if residual < tolerance:
+            break
+    return ranks
+
+
+def extrapolate(x0, x1, x2, x3):
+    """
+    Returns the quadratic extrapolation of four successive iterates, or
+    None if it cannot be trusted: when the iterates have (nearly)
+    stopped changing, the fit is ill-conditioned and its coefficients
+    can grow large enough to cancel the whole vector out.
+    """
+    y = np.stack([x1 - x0, x2 - x0], axis=1)
+    if np.abs(y).sum() <= EPSILON or np.abs(x3 - x0).sum() <= EPSILON:
+        return None
+    try:
+        (g1, g2), *_ = np.linalg.lstsq(y, -(x3 - x0), rcond=None)
+    except np.linalg.LinAlgError:
+        return None
+    g3 = 1
+    x = (g1 + g2 + g3) * x1 + (g2 + g3) * x2 + g3 * x3
+
+    # Normalize before clipping, so a vector of the wrong sign is caught
+    total = x.sum()
+    if not np.isfinite(total) or total <= 0 or not np.isfinite(x).all():
+        return None
+    x = np.maximum(x / total, 0)
+    return x / x.sum()
+
+
+def adaptive_iteration(matrix, damping_factor, tolerance=TOLERANCE,
+                       max_iterations=MAX_ITERATIONS, trace=None):
+    """
+    Returns the PageRank vector of a LinkMatrix computed by power
+    iteration that stops updating pages once they have converged.
+
+    Every ADAPTIVE iterations a full step is taken: it measures the
+    global residual, which alone decides convergence, and picks the
+    pages that still change by more than `tolerance` / N. Only those
+    pages, and only the links into them, are updated until the next
+    full step, so a page frozen too early is woken up again. The vector
+    is renormalized after each partial step, since frozen pages no
+    longer pass on the rank they receive.
+    """
+    n = matrix.n
+    d = damping_factor
+    ranks = np.full(n, 1 / n)
+    for iteration in range(1, max_iterations + 1):
+        if iteration % ADAPTIVE == 1:
+            updated = step(matrix, ranks, d)
+            change = np.abs(updated - ranks)
+            residual = change.sum()
+            ranks = updated
+            if trace is not None:
+                trace.append((iteration, residual))
+            if residual < tolerance:
+                break
+
+            # Links into the pages that are still changing
+            active = np.flatnonzero(change > tolerance / n)
+            links = np.isin(matrix.rows, active)
+            rows = np.searchsorted(active, matrix.rows[links])
+            sources = matrix.indices[links]
+            weights = d * matrix.data[links]
+            continue
+
+        spread = (1 - d + d * ranks[matrix.dangling].sum()) / n
+        updated = np.bincount(rows, weights=weights * ranks[sources],
+                              minlength=len(active)) + spread
+        residual = np.abs(updated - ranks[active]).sum()
+        ranks[active] = updated
+        ranks /= ranks.sum()
+        if trace is not None:
+            trace.append((iteration, residual))
+    return ranks / ranks.sum()
+
+
+SOLVERS = {
+    "power": power_iteration,
+    "gauss-seidel": gauss_seidel,
+    "extrapolation": extrapolated_iteration,
+    "adaptive": adaptive_iteration
+}
+
+
+def sparse_pagerank(corpus, damping_factor, tolerance=TOLERANCE,
+                    solver="power", trace=None):
+    """
+    Return PageRank values for each page of a corpus dictionary using
+    one of the sparse SOLVERS, in the same format as `iterate_pagerank`.
+    """
+    if solver not in SOLVERS:
+        raise ValueError(f"unknown solver {solver!r}")
+    matrix = LinkMatrix.from_corpus(corpus)
+    ranks = SOLVERS[solver](matrix, damping_factor, tolerance, trace=trace)
+    return dict(zip(matrix.pages, ranks.tolist()))
+
+
+def personalized_pagerank(matrix, teleports, damping_factor,
+                          tolerance=TOLERANCE,
+                          max_iterations=MAX_ITERATIONS):
+    """
+    Returns the personalized PageRank vectors of a LinkMatrix for an
+    N x K block of teleport distributions, as an N x K array with one
+    rank vector per column.
+
+    Random jumps, and the rank of dangling pages, go to each column's
+    own teleport distribution instead of to every page. The columns are
+    iterated in lockstep, and a column leaves the block once its L1
+    change is below `tolerance`, so each step only multiplies the
+    columns that are still converging.
+    """
+    d = damping_factor
+
+    # One row per teleport distribution keeps every vector contiguous,
+    # so each one's update stays in cache while it is computed
+    teleports = np.array(teleports, dtype=float).T
+    teleports /= teleports.sum(axis=1, keepdims=True)
+    ranks = teleports.copy()
+    active = list(range(len(ranks)))
+    for _ in range(max_iterations):
+        converging = []
+        for k in active:
+            dangling = ranks[k][matrix.dangling].sum()
+            updated = (d * matrix.dot(ranks[k])
+                       + (1 - d + d * dangling) * teleports[k])
+            if np.abs(updated - ranks[k]).sum() >= tolerance:
+                converging.append(k)
+            ranks[k] = updated
+        active = converging
+        if not active:
+            break
+    return ranks.T
+
+
+def topic_pagerank(corpus, topics, damping_factor, tolerance=TOLERANCE):
+    """
+    Return the pages of a corpus dictionary, in order, and an array of
+    their PageRank values personalized to each topic in `topics`, a list
+    of sets of seed pages: the value of page i for topic k is at [i, k].
+    A random jump from any page lands on one of the topic's seed pages.
+    """
+    matrix = LinkMatrix.from_corpus(corpus)
+    ids = {page: i for i, page in enumerate(matrix.pages)}
+    teleports = np.zeros((matrix.n, len(topics)))
+    for k, seeds in enumerate(topics):
+        if not seeds:
+            raise ValueError(f"topic {k} has no seed pages")
+        teleports[[ids[page] for page in seeds], k] = 1
+    ranks = personalized_pagerank(matrix, teleports, damping_factor,
+                                  tolerance)
+    return matrix.pages, ranks
+
+
+def update_pagerank(matrix, ranks, damping_factor, insertions=(),
+                    deletions=(), tolerance=TOLERANCE):
+    """
+    Returns the edited LinkMatrix and its PageRank vector, given the
+    PageRank vector `ranks` of `matrix` before links were inserted and
+    deleted.
+
+    PageRank is proportional to the solution x of the linear system
+    x = damping_factor * P x + (1 - damping_factor) / N, where dangling
+    pages simply lose their rank. The old ranks, scaled to solve the old
+    system, leave a residual on the new one only at the targets of pages
+    whose links changed. That residual is pushed along links, page by
+    page, until every page's share is small enough for the L1 error to
+    stay under `tolerance`, so the work follows the pages the edit
+    actually affects rather than the whole graph.
+    """
+    edited = matrix.edit(insertions, deletions)
+    n = matrix.n
+    d = damping_factor
+
+    # Scale the old ranks to solve the old linear system
+    dangling = ranks[matrix.dangling].sum()
+    x = ranks * (1 - d) / (1 - d + d * dangling)
+
+    # Rank each changed page no longer sends, and now sends, along links
+    residual = np.zeros(n)
+    changed = {s for s, _ in insertions} | {s for s, _ in deletions}
+    frontier = [np.zeros(0, dtype=np.int64)]
+    for links, sign in ((matrix, -1), (edited, 1)):
+        start, targets = links.links()
+        for page in changed:
+            degree = links.out_degree[page]
+            if degree:
+                reached = targets[start[page]:start[page + 1]]
+                np.add.at(residual, reached, sign * d * x[page] / degree)
+                frontier.append(reached)
+    # Latest position of each page in a list of reached pages, which
+    # finds the distinct pages in time proportional to the list
+    position = np.zeros(n, dtype=np.int64)
+
+    def distinct(pages):
+        position[pages] = np.arange(len(pages))
+        return pages[position[pages] == np.arange(len(pages))]
+
+    frontier = distinct(np.concatenate(frontier))
+
+    # Push residuals along links until they are all below the threshold
+    start, targets = edited.links()
+    threshold = tolerance * (1 - d) / n
+    while len(frontier):
+        frontier = frontier[np.abs(residual[frontier]) > threshold]
+        pushed = residual[frontier]
+        x[frontier] += pushed
+        residual[frontier] = 0
+
+        # Spread d * residual evenly over each pushed page's links
+        degree = edited.out_degree[frontier]
+        spreading = degree > 0
+        frontier, pushed, degree = (frontier[spreading], pushed[spreading],
+                                    degree[spreading])
+        offsets = np.repeat(start[frontier] - np.cumsum(degree) + degree,
+                            degree) + np.arange(degree.sum())
+        reached = targets[offsets]
+        spread = np.repeat(d * pushed / degree, degree)
+
+        # Once the change has spread over much of the graph, a dense
+        # update is cheaper than scattering link by link
+        if len(reached) > n // DENSE:
+            residual += np.bincount(reached, weights=spread, minlength=n)
+            frontier = np.flatnonzero(np.abs(residual) > threshold)
+        else:
+            np.add.at(residual, reached, spread)
+            frontier = distinct(reached)
+
+    return edited, x / x.sum()
+
+
+def incremental_pagerank(corpus, ranks, damping_factor, insertions=(),
+                         deletions=(), tolerance=TOLERANCE):
+    """
+    Return PageRank values for each page of a corpus dictionary after
+    the links in `insertions` are added and those in `deletions` are
+    removed, each given as (page, link) pairs, starting from the
+    PageRank values `ranks` of the unedited corpus.
+    """
+    matrix = LinkMatrix.from_corpus(corpus)
+    ids = {page: i for i, page in enumerate(matrix.pages)}
+    before = np.array([ranks[page] for page in matrix.pages])
+    _, after = update_pagerank(
+        matrix, before, damping_factor,
+        [(ids[page], ids[link]) for page, link in insertions],
+        [(ids[page], ids[link]) for page, link in deletions],
+        tolerance
+    )
+    return dict(zip(matrix.pages, after.tolist()))
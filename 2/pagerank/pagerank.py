@@ -3,29 +3,69 @@ import random
 import re
 import sys
 
+from cache import cached_crawl
+from engine import SOLVERS, sparse_pagerank
+
 DAMPING = 0.85
 SAMPLES = 10000
 
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
+    if len(sys.argv) not in (2, 3) or sys.argv[2:] and (
+            sys.argv[2] not in SOLVERS):
+        sys.exit(f"Usage: python pagerank.py corpus [{'|'.join(SOLVERS)}]")
+    corpus = Corpus(cached_crawl(sys.argv[1]))
     ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
-    print(f"PageRank Results from Iteration")
+    if len(sys.argv) == 3:
+        #Sparse engine, for corpora too large for iterate_pagerank
+        ranks = sparse_pagerank(corpus, DAMPING, solver=sys.argv[2])
+        print(f"PageRank Results from Iteration ({sys.argv[2]} solver)")
+    else:
+        ranks = iterate_pagerank(corpus, DAMPING)
+        print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
 
 
-def crawl(directory):
+class Corpus(dict):
+    """
+    A corpus dictionary, mapping each page to the set of pages it links
+    to, that also indexes its link graph: every page gets an integer ID,
+    and `forward` and `reverse` list the IDs each page links to and is
+    linked from. The index is built once, so the corpus should not be
+    changed afterwards.
+    """
+
+    def __init__(self, pages):
+        super().__init__(pages)
+        self.pages = sorted(self)
+        self.ids = {page: i for i, page in enumerate(self.pages)}
+        self.forward = [
+            sorted(self.ids[link] for link in self[page])
+            for page in self.pages
+        ]
+        self.reverse = [[] for _ in self.pages]
+        for i, links in enumerate(self.forward):
+            for j in links:
+                self.reverse[j].append(i)
+        self.out_degree = [len(links) for links in self.forward]
+
+    def inlinks(self, page):
+        """
+        Returns the pages that link to `page`.
+        """
+        return [self.pages[i] for i in self.reverse[self.ids[page]]]
+
+
+def crawl(directory, indexed=False):
     """
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
+    If `indexed` is true, return it as a Corpus with its links indexed.
     """
     pages = dict()
 
@@ -45,6 +85,8 @@ def crawl(directory):
             if link in pages
         )
 
+    if indexed:
+        return Corpus(pages)
     return pages
 
 
@@ -115,47 +157,34 @@ def iterate_pagerank(corpus, damping_factor):
     PageRank values should sum to 1.
     """
     
+    if not isinstance(corpus, Corpus):
+        corpus = Corpus(corpus)
+
     N = len(corpus.keys())
     Const1 = (1-damping_factor)/N
     Const2 = 0
     IPR = dict()
     IPR1 = dict()
-    IPR2 = dict()
     Iteration = True
 
     for page in corpus.keys():
         IPR[page] = 1/N
-        IPR2[page] = True
 
     IPR1 = IPR.copy()
 
     while Iteration:
+        #A page with no links counts as linking to every page
+        Dangling = sum(IPR1[page] for page in corpus.keys() if not corpus.get(page))/N
         for page in corpus.keys():
-            for link in Links_List(corpus, page):
-                Const2 = Const2 + IPR[link]/len(corpus.get(link))
-            IPR[page] = Const1 + damping_factor*Const2
+            for link in corpus.inlinks(page):
+                Const2 = Const2 + IPR1[link]/len(corpus.get(link))
+            IPR[page] = Const1 + damping_factor*(Const2 + Dangling)
             Const2 = 0 
-        for page in IPR.keys():
-            if (abs(IPR[page] - IPR1[page]) <= 0.001 and IPR2[page]==True) or IPR2[page]==False:
-                IPR2[page] = False
-            else:
-                IPR2[page] = True
+        #Stop only once every page changes by at most 0.001 in the same
+        #sweep, so no page is treated as done while its inlinks still move
+        Iteration = any(abs(IPR[page] - IPR1[page]) > 0.001 for page in IPR.keys())
         IPR1 = IPR.copy()
-        if set(IPR2.values()) == {False}:
-            Iteration = False
-        else:
-            Iteration = True
     return IPR          
     
-def Links_List(corpus, page):
-    #select the pages with link to page
-    LinkToPage = []
-    for Page in corpus.keys():
-        for links in corpus.get(Page):
-            if links == page:
-                LinkToPage.append(Page)
-    
-    return LinkToPage
-    
 if __name__ == "__main__":
     main()
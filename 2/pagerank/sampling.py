@@ -0,0 +1,175 @@
+import math
+
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import LinkMatrix
+
+WALKERS = 1000
+CHUNK = 1000000
+BURN_IN = 100
+BATCHES = 16
+CONFIDENCE = 0.95
+
+# Surfers of each worker process, set up once by _init_worker
+_surfer = None
+
+
+class Surfer():
+    """
+    Random surfers over the outlinks of a LinkMatrix.
+
+    Within a page every link is equally likely, so a step needs no
+    probability table: with probability `damping_factor` a surfer on a
+    page with links follows the link at a uniformly random offset into
+    the page's outlinks, and otherwise (or on a dangling page) it jumps
+    to a uniformly random page. Every step is O(1) per surfer.
+    """
+
+    def __init__(self, matrix, damping_factor):
+        self.n = matrix.n
+        self.damping_factor = damping_factor
+        self.out_degree = matrix.out_degree
+
+        self.start, self.links = matrix.links()
+
+    def step(self, pages, rng):
+        """
+        Returns the pages reached from `pages` after one step each.
+        """
+        pages_next = rng.integers(0, self.n, len(pages))
+        degree = self.out_degree[pages]
+        follow = (rng.random(len(pages)) < self.damping_factor) & (degree > 0)
+        offset = rng.integers(0, degree[follow])
+        pages_next[follow] = self.links[self.start[pages[follow]] + offset]
+        return pages_next
+
+    def visits(self, n, walkers=WALKERS, rng=None):
+        """
+        Runs `walkers` surfers from uniformly random pages until `n`
+        pages have been sampled in total, and returns how many times
+        each page was sampled.
+
+        Surfers first take BURN_IN unrecorded steps, so that short walks
+        do not over-sample their uniformly random starting pages. Fewer
+        surfers are run when `n` is small, so that burn-in never takes
+        more steps than are sampled.
+        """
+        rng = np.random.default_rng(rng)
+        walkers = max(1, min(walkers, n // BURN_IN))
+        counts = np.zeros(self.n, dtype=np.int64)
+        pages = rng.integers(0, self.n, walkers)
+        for _ in range(BURN_IN):
+            pages = self.step(pages, rng)
+
+        # Record whole steps of every surfer at once, in chunks of no
+        # more steps than are still needed
+        sampled = 0
+        while sampled < n:
+            steps = min(max(1, CHUNK // walkers),
+                        math.ceil((n - sampled) / walkers))
+            chunk = np.empty((steps, walkers), dtype=np.int64)
+            for i in range(steps):
+                chunk[i] = pages
+                pages = self.step(pages, rng)
+            chunk = chunk.ravel()[:n - sampled]
+            counts += np.bincount(chunk, minlength=self.n)
+            sampled += len(chunk)
+        return counts
+
+
+def vectorized_pagerank(corpus, damping_factor, n, walkers=WALKERS,
+                        seed=None):
+    """
+    Return PageRank values for each page by sampling `n` pages with
+    `walkers` random surfers stepping together, in the same format as
+    `sample_pagerank`.
+    """
+    matrix = LinkMatrix.from_corpus(corpus)
+    counts = Surfer(matrix, damping_factor).visits(n, walkers, seed)
+    return dict(zip(matrix.pages, (counts / n).tolist()))
+
+
+def parallel_pagerank(corpus, damping_factor, n, processes=None,
+                      batches=BATCHES, walkers=WALKERS, seed=None):
+    """
+    Return PageRank values for each page by sampling `n` pages in
+    `batches` independent batches of random surfers, spread over a pool
+    of `processes` worker processes (one per CPU by default).
+
+    Every batch gets its own seed, spawned from `seed`, so results are
+    reproducible whatever the number of processes. Returns the PageRank
+    values, in the same format as `sample_pagerank`, and a dictionary
+    mapping each page to a 95% confidence interval, from the spread of
+    the batch estimates around their mean and Student's t distribution.
+    """
+    matrix = LinkMatrix.from_corpus(corpus)
+    batches = max(2, min(batches, n))
+    sizes = [n // batches + (i < n % batches) for i in range(batches)]
+    seeds = np.random.SeedSequence(seed).spawn(batches)
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(matrix, damping_factor)) as executor:
+        counts = np.array(list(executor.map(
+            _visit_batch, sizes, [walkers] * batches, seeds
+        )))
+
+    # Each batch is an independent estimate of the whole rank vector
+    estimates = counts / np.array(sizes)[:, None]
+    ranks = counts.sum(axis=0) / n
+    # Few batches, so use Student's t rather than the normal quantile
+    quantile = t_quantile((1 + CONFIDENCE) / 2, batches - 1)
+    error = quantile * estimates.std(axis=0, ddof=1) / np.sqrt(batches)
+    low = np.clip(ranks - error, 0, 1)
+    high = np.clip(ranks + error, 0, 1)
+    intervals = zip(low.tolist(), high.tolist())
+    return (dict(zip(matrix.pages, ranks.tolist())),
+            dict(zip(matrix.pages, intervals)))
+
+
+def t_quantile(probability, df):
+    """
+    Returns the `probability` quantile of Student's t distribution with
+    `df` degrees of freedom, for probabilities of at least 0.5, by
+    bisection on its cumulative distribution. The distribution's density
+    is integrated with Simpson's rule.
+    """
+    scale = math.exp(math.lgamma((df + 1) / 2) - math.lgamma(df / 2)
+                     - 0.5 * math.log(df * math.pi))
+
+    def density(x):
+        return scale * (1 + x * x / df) ** (-(df + 1) / 2)
+
+    def cdf(x, steps=200):
+        h = x / steps
+        total = density(0) + density(x)
+        for i in range(1, steps):
+            total += (4 if i % 2 else 2) * density(i * h)
+        return 0.5 + total * h / 3
+
+    low, high = 0.0, 1.0
+    while cdf(high) < probability:
+        low, high = high, 2 * high
+    for _ in range(50):
+        middle = (low + high) / 2
+        if cdf(middle) < probability:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+
+def _init_worker(matrix, damping_factor):
+    """
+    Sets up the surfers shared by every batch run in a worker process.
+    """
+    global _surfer
+    _surfer = Surfer(matrix, damping_factor)
+
+
+def _visit_batch(n, walkers, seed):
+    """
+    Returns the visit counts of one batch of `n` samples.
+    """
+    return _surfer.visits(n, walkers, seed)